@@ -0,0 +1,435 @@
+# aggregates.py
+import heapq
+import itertools
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from metrics import instrument, measure
+from storage import TABLES, Derived, load_data
+
+
+def _scopes(vendor_id):
+    # Every row counts towards the global scope (None) and its vendor's
+    return (None,) if vendor_id is None or pd.isna(vendor_id) else (None, vendor_id)
+
+
+def _status_key(status):
+    return str(status).strip().lower() if not pd.isna(status) else ""
+
+
+def _put(rows, row_id, value, add):
+    # Sets rows[row_id] and moves the counters with add(value, sign). A row already held is
+    # taken out first, which is also what makes a replayed insert from sync_changes harmless.
+    old = rows.get(row_id)
+    if old is not None:
+        add(old, -1)
+    rows[row_id] = value
+    add(value, 1)
+
+
+# ---------- KPI Store ----------
+# Global and per-vendor complaint counters and rating sums, updated in O(1) per write.
+# rebuild() scans the tables and is only used on first use and for recovery.
+class KpiStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rebuild()
+
+    @instrument("aggregates.kpi_store.rebuild")
+    def rebuild(self):
+        complaints = load_data("complaints")
+        reviews = load_data("reviews")
+        # Status keys are normalized once per category and gathered through the integer codes
+        status_codes = complaints["complaint_status"].cat.codes.to_numpy()
+        status_labels = np.array([_status_key(c) for c in complaints["complaint_status"].cat.categories] + [""], dtype=object)
+        statuses = status_labels[status_codes]
+        ratings = pd.to_numeric(reviews["rating"], errors="coerce").astype("float64")
+        rated = reviews.assign(rating=ratings).dropna(subset=["rating"])
+        with self._lock:
+            # complaint_id -> (vendor_id, status) and review_id -> (vendor_id, rating), so that
+            # status flips and rating edits can move a row between counters without a scan
+            self._complaints = dict(zip(complaints["complaint_id"], zip(complaints["vendor_id"], statuses)))
+            self._reviews = dict(zip(rated["review_id"], zip(rated["vendor_id"], rated["rating"])))
+            self._complaint_counts = Counter()
+            self._status_counts = Counter()
+            for (vendor_id, status), n in Counter(self._complaints.values()).items():
+                for scope in _scopes(vendor_id):
+                    self._complaint_counts[scope] += n
+                    self._status_counts[scope, status] += n
+            self._rating_sum = Counter()
+            self._rating_count = Counter()
+            for vendor_id, rating in self._reviews.values():
+                self._add_rating(vendor_id, rating, 1)
+
+    def _add_complaint(self, entry, sign):
+        vendor_id, status = entry
+        for scope in _scopes(vendor_id):
+            self._complaint_counts[scope] += sign
+            self._status_counts[scope, status] += sign
+
+    def _add_rating(self, vendor_id, rating, sign):
+        for scope in _scopes(vendor_id):
+            self._rating_sum[scope] += sign * rating
+            self._rating_count[scope] += sign
+
+    def on_complaint_insert(self, row):
+        entry = (row.get("vendor_id"), _status_key(row.get("complaint_status")))
+        with self._lock:
+            _put(self._complaints, row["complaint_id"], entry, self._add_complaint)
+
+    def on_complaint_update(self, complaint_id, changes):
+        if "complaint_status" not in changes and "vendor_id" not in changes:
+            return
+        with self._lock:
+            old = self._complaints.get(complaint_id)
+            if old is None:
+                return
+            new = (changes.get("vendor_id", old[0]), _status_key(changes.get("complaint_status", old[1])))
+            _put(self._complaints, complaint_id, new, self._add_complaint)
+
+    def on_review_insert(self, row):
+        rating = pd.to_numeric(row.get("rating"), errors="coerce")
+        with self._lock:
+            old = self._reviews.pop(row["review_id"], None)
+            if old is not None:
+                self._add_rating(*old, -1)
+            if not pd.isna(rating):
+                self._reviews[row["review_id"]] = (row.get("vendor_id"), float(rating))
+                self._add_rating(row.get("vendor_id"), float(rating), 1)
+
+    def on_review_update(self, review_id, changes):
+        if "rating" not in changes and "vendor_id" not in changes:
+            return
+        with self._lock:
+            old = self._reviews.pop(review_id, None)
+            if old is not None:
+                self._add_rating(*old, -1)
+        if old is not None:
+            self.on_review_insert({"review_id": review_id, "vendor_id": changes.get("vendor_id", old[0]),
+                                   "rating": changes.get("rating", old[1])})
+
+    # ----- reads, vendor_id=None means all vendors -----
+    def total_complaints(self, vendor_id=None):
+        return self._complaint_counts[vendor_id]
+
+    def complaints_with_status(self, status, vendor_id=None):
+        return self._status_counts[vendor_id, _status_key(status)]
+
+    def avg_rating(self, vendor_id=None):
+        count = self._rating_count[vendor_id]
+        return round(self._rating_sum[vendor_id] / count, 2) if count else 0
+
+
+def _on_fact_change(aggregate, event, table, payload):
+    # For the KPI store and the analytics cube, which handle complaint and review writes alike
+    if table == "complaints":
+        if event == "insert":
+            aggregate.on_complaint_insert(payload)
+        else:
+            aggregate.on_complaint_update(payload["key"], payload["changes"])
+    elif event == "insert":
+        aggregate.on_review_insert(payload)
+    else:
+        aggregate.on_review_update(payload["key"], payload["changes"])
+
+
+_store = Derived(KpiStore, _on_fact_change, ("complaints", "reviews"))
+
+
+def get_kpi_store():
+    return _store.get()
+
+
+# ---------- Recent Activity ----------
+# Bounded min-heaps of the newest complaints/reviews, globally and per vendor. Inserts are
+# O(log capacity) and latest(n) never touches the full table. An update that moves a held row
+# to another vendor or date can pull in a row no heap holds any more, so it marks the table for
+# a rebuild on its next read instead (the app itself never changes either column).
+RECENT_TABLES = {"complaints": ("complaint_id", "complaint_date"), "reviews": ("review_id", "review_date")}
+
+
+def _sort_key(value):
+    value = pd.Timestamp(value) if value is not None else pd.NaT
+    return pd.Timestamp.min if pd.isna(value) else value
+
+
+class RecentFeed:
+    def __init__(self, capacity=50):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._heaps, self._held = {}, {}
+        self._stale = set()
+        # table -> the writes that arrived while it is being rebuilt, applied once it is
+        self._pending = {}
+        self._rebuild_lock = threading.Lock()
+        self.rebuild()
+
+    @instrument("aggregates.recent_feed.rebuild")
+    def rebuild(self, tables=tuple(RECENT_TABLES)):
+        with self._rebuild_lock:
+            with self._lock:
+                self._pending.update((table, []) for table in tables)
+            heaps, held = {}, {}
+            for table in tables:
+                date_col = RECENT_TABLES[table][1]
+                df = load_data(table)
+                newest = df.sort_values(date_col, kind="stable").groupby("vendor_id", dropna=False).tail(self.capacity)
+                heaps[table], held[table] = defaultdict(list), {}
+                for row in newest.to_dict("records"):
+                    self._push(heaps[table], held[table], table, row)
+            with self._lock:
+                self._heaps.update(heaps)
+                self._held.update(held)
+                self._stale.difference_update(tables)
+                for table in tables:
+                    for event, args in self._pending.pop(table):
+                        (self._insert if event == "insert" else self._update)(table, *args)
+
+    def _push(self, heaps, held, table, row):
+        # held: id -> [row, number of heaps holding it], so updates can patch a row in O(1)
+        key, date_col = RECENT_TABLES[table]
+        entry = (_sort_key(row.get(date_col)), next(self._seq), row)
+        for scope in _scopes(row.get("vendor_id")):
+            heap = heaps[scope]
+            if len(heap) < self.capacity:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                self._release(held, key, heapq.heapreplace(heap, entry)[2])
+            else:
+                continue
+            held.setdefault(row[key], [row, 0])[1] += 1
+
+    @staticmethod
+    def _release(held, key, row):
+        slot = held.get(row[key])
+        if slot is not None:
+            slot[1] -= 1
+            if slot[1] <= 0:
+                del held[row[key]]
+
+    def on_insert(self, table, row):
+        with self._lock:
+            if table in self._pending:
+                self._pending[table].append(("insert", (row,)))
+            else:
+                self._insert(table, row)
+
+    def on_update(self, table, key_value, changes):
+        with self._lock:
+            if table in self._pending:
+                self._pending[table].append(("update", (key_value, changes)))
+            else:
+                self._update(table, key_value, changes)
+
+    def _insert(self, table, row):
+        # An insert of a held row (a replay from sync_changes) is an update
+        key = RECENT_TABLES[table][0]
+        if row[key] in self._held[table]:
+            self._update(table, row[key], {col: value for col, value in row.items() if col != key})
+        elif table not in self._stale:
+            self._push(self._heaps[table], self._held[table], table, dict(row))
+
+    def _update(self, table, key_value, changes):
+        key, date_col = RECENT_TABLES[table]
+        slot = self._held[table].get(key_value)
+        if slot is not None:
+            row = slot[0]
+            if ("vendor_id" in changes and _scopes(changes["vendor_id"]) != _scopes(row.get("vendor_id"))
+                    or date_col in changes and _sort_key(changes[date_col]) != _sort_key(row.get(date_col))):
+                self._stale.add(table)
+            else:
+                row.update(changes)
+        elif "vendor_id" in changes or date_col in changes:
+            # A row outside every heap can only move into some; that takes the whole row
+            if set(TABLES[table]["columns"]) - {key} <= set(changes):
+                if table not in self._stale:
+                    self._push(self._heaps[table], self._held[table], table, {key: key_value, **changes})
+            else:
+                self._stale.add(table)
+
+    def latest(self, table, n=5, vendor_id=None):
+        # Newest first; n is capped by the feed capacity
+        if table in self._stale:
+            self.rebuild((table,))
+        with self._lock:
+            entries = heapq.nlargest(n, self._heaps[table].get(vendor_id, []))
+        return pd.DataFrame([row for _, _, row in entries], columns=list(TABLES[table]["columns"]))
+
+
+def _on_recent_change(feed, event, table, payload):
+    if event == "insert":
+        feed.on_insert(table, payload)
+    else:
+        feed.on_update(table, payload["key"], payload["changes"])
+
+
+_feed = Derived(RecentFeed, _on_recent_change, RECENT_TABLES)
+
+
+def get_recent_feed():
+    return _feed.get()
+
+
+# ---------- Analytics Cube ----------
+# Complaint counts by (product, vendor, priority, status, day) plus rating sums/counts by
+# product and vendor, maintained incrementally. `version` moves on every change and keys the
+# cached Plotly figures, so an unchanged cube never rebuilds a chart. Next to the global
+# marginals, every vendor and every product keeps its own, so one-vendor or one-product
+# drill-downs are dictionary reads rather than a scan of all cells.
+CUBE_DIMENSIONS = ("product_id", "vendor_id", "complaint_priority", "complaint_status", "day")
+SLICE_DIMENSIONS = ("product_id", "vendor_id")
+RATING_DIMENSIONS = ("product_id", "vendor_id")
+FIGURE_CACHE_SIZE = 64
+
+
+def _day(value):
+    value = pd.Timestamp(value) if value is not None else pd.NaT
+    return None if pd.isna(value) else value.normalize()
+
+
+class AnalyticsCube:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._figures = {}
+        self.rebuild()
+
+    @instrument("aggregates.analytics_cube.rebuild")
+    def rebuild(self):
+        complaints = load_data("complaints")
+        reviews = load_data("reviews")
+        days = complaints["complaint_date"].dt.normalize().astype(object).where(complaints["complaint_date"].notna(), None)
+        columns = [complaints[dim] for dim in CUBE_DIMENSIONS[:-1]] + [days]
+        ratings = pd.to_numeric(reviews["rating"], errors="coerce").astype("float64")
+        rated = reviews.assign(rating=ratings).dropna(subset=["rating"])
+        with self._lock:
+            self._complaints = dict(zip(complaints["complaint_id"], zip(*columns)))
+            self._cells = Counter()
+            self._marginals = {dim: Counter() for dim in CUBE_DIMENSIONS}
+            # slice dimension -> value -> dimension -> Counter, e.g. [vendor_id][V001][day]
+            self._slices = {dim: {} for dim in SLICE_DIMENSIONS}
+            for cell, n in Counter(self._complaints.values()).items():
+                self._add_cell(cell, n)
+            self._reviews = dict(zip(rated["review_id"], zip(rated["product_id"], rated["vendor_id"], rated["rating"])))
+            self._rating_sum = {dim: Counter() for dim in RATING_DIMENSIONS}
+            self._rating_count = {dim: Counter() for dim in RATING_DIMENSIONS}
+            for entry in self._reviews.values():
+                self._add_rating(entry, 1)
+            self.version += 1
+
+    def _add_cell(self, cell, n):
+        self._cells[cell] += n
+        if self._cells[cell] == 0:
+            del self._cells[cell]
+        for dim, value in zip(CUBE_DIMENSIONS, cell):
+            self._marginals[dim][value] += n
+        for slice_dim in SLICE_DIMENSIONS:
+            value = cell[CUBE_DIMENSIONS.index(slice_dim)]
+            marginals = self._slices[slice_dim].get(value)
+            if marginals is None:
+                marginals = self._slices[slice_dim][value] = {dim: Counter() for dim in CUBE_DIMENSIONS}
+            for dim, cell_value in zip(CUBE_DIMENSIONS, cell):
+                marginals[dim][cell_value] += n
+
+    def _add_rating(self, entry, sign):
+        *keys, rating = entry
+        for dim, value in zip(RATING_DIMENSIONS, keys):
+            self._rating_sum[dim][value] += sign * rating
+            self._rating_count[dim][value] += sign
+
+    def on_complaint_insert(self, row):
+        cell = tuple(row.get(dim) for dim in CUBE_DIMENSIONS[:-1]) + (_day(row.get("complaint_date")),)
+        with self._lock:
+            _put(self._complaints, row["complaint_id"], cell, self._add_cell)
+            self.version += 1
+
+    def on_complaint_update(self, complaint_id, changes):
+        if not any(dim in changes for dim in CUBE_DIMENSIONS[:-1] + ("complaint_date",)):
+            return
+        with self._lock:
+            old = self._complaints.get(complaint_id)
+            if old is None:
+                return
+            new = tuple(changes.get(dim, value) for dim, value in zip(CUBE_DIMENSIONS[:-1], old))
+            new += (_day(changes["complaint_date"]) if "complaint_date" in changes else old[-1],)
+            _put(self._complaints, complaint_id, new, self._add_cell)
+            self.version += 1
+
+    def on_review_insert(self, row):
+        rating = pd.to_numeric(row.get("rating"), errors="coerce")
+        with self._lock:
+            old = self._reviews.pop(row["review_id"], None)
+            if old is not None:
+                self._add_rating(old, -1)
+            if not pd.isna(rating):
+                entry = (row.get("product_id"), row.get("vendor_id"), float(rating))
+                self._reviews[row["review_id"]] = entry
+                self._add_rating(entry, 1)
+            self.version += 1
+
+    def on_review_update(self, review_id, changes):
+        if not any(col in changes for col in RATING_DIMENSIONS + ("rating",)):
+            return
+        with self._lock:
+            old = self._reviews.pop(review_id, None)
+            if old is not None:
+                self._add_rating(old, -1)
+        if old is not None:
+            self.on_review_insert({
+                "review_id": review_id,
+                "product_id": changes.get("product_id", old[0]),
+                "vendor_id": changes.get("vendor_id", old[1]),
+                "rating": changes.get("rating", old[2]),
+            })
+
+    # ----- reads -----
+    def complaint_counts(self, by, **filters):
+        # Complaint counts grouped by one dimension, optionally drilled down with
+        # dimension=value filters. Unfiltered and single vendor/product reads come straight
+        # from the marginals; other combinations scan the cells.
+        with self._lock:
+            if not filters:
+                counts = dict(self._marginals[by])
+            elif len(filters) == 1 and next(iter(filters)) in SLICE_DIMENSIONS:
+                (dim, value), = filters.items()
+                marginals = self._slices[dim].get(value)
+                counts = dict(marginals[by]) if marginals is not None else {}
+            else:
+                positions = {CUBE_DIMENSIONS.index(dim): value for dim, value in filters.items()}
+                by_pos = CUBE_DIMENSIONS.index(by)
+                counts = Counter()
+                for cell, n in self._cells.items():
+                    if all(cell[pos] == value for pos, value in positions.items()):
+                        counts[cell[by_pos]] += n
+        return pd.Series(counts, dtype="int64").loc[lambda s: s > 0].sort_values(ascending=False)
+
+    def average_ratings(self, by):
+        with self._lock:
+            sums, counts = self._rating_sum[by], self._rating_count[by]
+            means = {key: sums[key] / n for key, n in counts.items() if n}
+        return pd.Series(means, dtype="float64").sort_values(ascending=False)
+
+    def figure(self, name, build):
+        # Figures are rebuilt only when the cube has changed since they were drawn
+        cached = self._figures.get(name)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        version = self.version
+        with measure("analytics.figure", str(name)):
+            fig = build()
+        self._figures.pop(name, None)
+        self._figures[name] = (version, fig)
+        while len(self._figures) > FIGURE_CACHE_SIZE:
+            self._figures.pop(next(iter(self._figures)))
+        return fig
+
+
+_cube = Derived(AnalyticsCube, _on_fact_change, ("complaints", "reviews"))
+
+
+def get_analytics_cube():
+    return _cube.get()
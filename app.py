@@ -2,43 +2,52 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import os
-
-
-# ---------- File Paths ----------
-DATA_DIR = "Data"
-USERS_FILE = os.path.join(DATA_DIR, "users_db.xlsx")
-VENDORS_FILE = os.path.join(DATA_DIR, "vendors_db.xlsx")
-PRODUCTS_FILE = os.path.join(DATA_DIR, "products_db.xlsx")
-COMPLAINTS_FILE = os.path.join(DATA_DIR, "complaints_db.xlsx")
-REVIEWS_FILE = os.path.join(DATA_DIR, "rexiews_db.xlsx")
-# ---------- Helper Functions ----------
-
-def load_data(file_path):
-    return pd.read_excel(file_path)
-
-def save_data(df, file_path):
-    df.to_excel(file_path, index=False)
-
-def generate_new_id(df, column_name, prefix):
-    if df.empty:
-        return f"{prefix}001"
-    else:
-        nums = df[column_name].str.replace(prefix, "").astype(int)
-        new_num = nums.max() + 1
-        return f"{prefix}{new_num:03d}"
-
-# Load all data
-users_df = load_data(USERS_FILE)
-vendors_df = load_data(VENDORS_FILE)
-products_df = load_data(PRODUCTS_FILE)
-complaints_df = load_data(COMPLAINTS_FILE)
-reviews_df = load_data(REVIEWS_FILE)
+import time
+import uuid
+
+from storage import (
+    load_data, sync_changes, table_cache, insert_record, update_record, allocate_id, get_record, search_ids, query_complaints,
+    search_text, get_or_create_user, normalize_name, export_runs, count_rows,
+    COMPLAINT_STATUSES, COMPLAINT_PRIORITIES, COMPLAINT_SORT_COLUMNS, TABLES,
+)
+from indexes import get_dimension_index, get_vendor_partitions
+from sentiment import score_in_background, score_many_in_background
+from bulk import BULK_TABLES, read_upload, validate_batch, import_batch, set_complaint_status, set_matching_complaint_status
+from chatbot import faq, chatbot_response
+from aggregates import get_kpi_store, get_recent_feed, get_analytics_cube
+from metrics import ADMIN_TOKEN, instrument, measure, registry, start_file_exporter
+from export import (
+    EXPORT_FORMATS, EXPORT_TABLES, UI_MAX_ROWS as EXPORT_UI_MAX_ROWS, download as export_download,
+    file_name as export_file_name, start_scheduled_export,
+)
+
+# Load all data; sync_changes first picks up whatever other server processes wrote
+sync_changes()
+users_df = load_data("users")
+vendors_df = load_data("vendors")
+products_df = load_data("products")
+dims = get_dimension_index()
+vendor_parts = get_vendor_partitions()
+kpi_store = get_kpi_store()
+recent_feed = get_recent_feed()
+analytics_cube = get_analytics_cube()
+RECENT_COUNT = 5
+
+# Identifies this browser session; new users are created once per (session, name)
+if "session_token" not in st.session_state:
+    st.session_state["session_token"] = uuid.uuid4().hex
+
+# Admin pages are routed only for sessions opened with ?admin=<FEEDBACK_ADMIN_TOKEN>
+if ADMIN_TOKEN and st.query_params.get("admin") == ADMIN_TOKEN:
+    st.session_state["is_admin"] = True
+start_file_exporter()
+start_scheduled_export()
 
 # ---------- Pages ----------
 
 
 
+@instrument("page.home")
 def page_home():
     st.title("🌟 Customer Feedback & Analytics Hub")
     st.markdown("""
@@ -76,10 +85,10 @@ def page_home():
     )
 
     # ----------------- Compute KPIs -----------------
-    total_complaints = len(complaints_df)
-    resolved_complaints = complaints_df[complaints_df['complaint_status'].str.lower() == 'resolved'].shape[0]
-    pending_complaints = complaints_df[complaints_df['complaint_status'].str.lower() == 'pending'].shape[0]
-    avg_rating = reviews_df['rating'].mean() if not reviews_df.empty else 0
+    total_complaints = kpi_store.total_complaints()
+    resolved_complaints = kpi_store.complaints_with_status('resolved')
+    pending_complaints = kpi_store.complaints_with_status('pending')
+    avg_rating = kpi_store.avg_rating()
     total_users = len(users_df)
     total_vendors = len(vendors_df)
 
@@ -113,57 +122,48 @@ def page_home():
 
     # ----------------- Recent Complaints -----------------
     st.markdown("### 📝 Recent Complaints")
-    if not complaints_df.empty:
-        recent_complaints = complaints_df.sort_values("complaint_date", ascending=False).head(5)
+    recent_complaints = recent_feed.latest("complaints", RECENT_COUNT)
+    if not recent_complaints.empty:
         # Replace IDs with names
         recent_complaints_display = recent_complaints.copy()
-        recent_complaints_display["user_id"] = recent_complaints_display["user_id"].map(
-            dict(zip(users_df["user_id"], users_df["name"]))
-        )
-        recent_complaints_display["product_id"] = recent_complaints_display["product_id"].map(
-            dict(zip(products_df["product_id"], products_df["product_name"]))
-        )
-        recent_complaints_display["vendor_id"] = recent_complaints_display["vendor_id"].map(
-            dict(zip(vendors_df["vendor_id"], vendors_df["vendor_name"]))
-        )
+        recent_complaints_display["user_id"] = recent_complaints_display["user_id"].map(dims.user_name)
+        recent_complaints_display["product_id"] = recent_complaints_display["product_id"].map(dims.product_name)
+        recent_complaints_display["vendor_id"] = recent_complaints_display["vendor_id"].map(dims.vendor_name)
         st.dataframe(recent_complaints_display[["complaint_id","user_id","product_id","vendor_id","complaint_status"]])
     else:
         st.info("No complaints yet.")
 
 # ---------- Submit Complaint ----------
+@instrument("page.submit_complaint")
 def page_submit_complaint():
     st.subheader("📝 Submit a Complaint")
 
     # Option to select existing user or enter new one
     user_choice = st.radio("Select User Option", ["Existing User", "New User"])
     if user_choice == "Existing User":
-        user_name = st.selectbox("Select User", users_df['name'])
-        user_id = users_df[users_df['name'] == user_name]['user_id'].values[0]
+        user_name = st.selectbox("Select User", dims.user_names)
+        user_id = dims.user_id_by_name[user_name]
     else:
         user_name = st.text_input("Enter Your Name")
         if user_name.strip() != "":
-            # Generate new user_id
-            new_user_id = generate_new_id(users_df, "user_id", "U")
-            users_df.loc[len(users_df)] = {
-                "user_id": new_user_id,
-                "name": user_name,
-                "state": "Unknown"  # default
-            }
-            save_data(users_df, USERS_FILE)
-            user_id = new_user_id
+            # The user is only created when the form is submitted, not on every rerun
+            user_id = None
+            existing_id = dims.user_id_by_normalized_name.get(normalize_name(user_name))
+            if existing_id is not None:
+                st.info(f"A user named '{user_name.strip()}' already exists ({existing_id}). "
+                        "Choose 'Existing User' to file under that profile.")
         else:
             st.warning("Please enter a valid name")
             return
 
     # Select product by name
-    product_name = st.selectbox("Select Product", products_df['product_name'])
-    product_row = products_df[products_df['product_name'] == product_name].iloc[0]
-    product_id = product_row['product_id']
-    vendor_id = product_row['vendor_id']
-    fssai_code = product_row.get('fssai_code', 'N/A')   # <-- fetch FSSAI Code
+    product_name = st.selectbox("Select Product", dims.product_names)
+    product_id, vendor_id, fssai_code = dims.product(product_name)   # <-- fetch FSSAI Code
+    if fssai_code is None:
+        fssai_code = 'N/A'
 
     # Display vendor + FSSAI info
-    vendor_name = vendors_df[vendors_df['vendor_id'] == vendor_id]['vendor_name'].values[0]
+    vendor_name = dims.vendor_name[vendor_id]
     st.text(f"Vendor: {vendor_name}")
     st.text(f"FSSAI Code: {fssai_code}")   # <-- show FSSAI code
 
@@ -172,7 +172,9 @@ def page_submit_complaint():
     complaint_status = st.selectbox("Status", ["Pending", "Resolved"])
 
     if st.button("Submit Complaint"):
-        new_id = generate_new_id(complaints_df, "complaint_id", "C")
+        if user_id is None:
+            user_id, _ = get_or_create_user(user_name, st.session_state["session_token"])
+        new_id = allocate_id("complaints")
         new_row = {
             "complaint_id": new_id,
             "user_id": user_id,
@@ -183,54 +185,52 @@ def page_submit_complaint():
             "complaint_status": complaint_status,
             "complaint_priority": complaint_priority,
             "complaint_date": datetime.now(),
-            "complaint_image_url": ""
+            "complaint_image_url": "",
+            "complaint_sentiment": None  # filled in by the background scorer
         }
-        complaints_df.loc[len(complaints_df)] = new_row
-        save_data(complaints_df, COMPLAINTS_FILE)
+        insert_record("complaints", new_row)
+        score_in_background("complaints", new_id, complaint_text)
         st.success("Complaint submitted successfully!")
 
 
 # ---------- Submit Review ----------
+@instrument("page.submit_review")
 def page_submit_review():
     st.subheader("📝 Submit a Review")
 
     # Option to select existing user or enter new one
     user_choice = st.radio("Select User Option", ["Existing User", "New User"])
     if user_choice == "Existing User":
-        user_name = st.selectbox("Select User", users_df['name'])
-        user_id = users_df[users_df['name']==user_name]['user_id'].values[0]
+        user_name = st.selectbox("Select User", dims.user_names)
+        user_id = dims.user_id_by_name[user_name]
     else:
         user_name = st.text_input("Enter Your Name")
         if user_name.strip() != "":
-            # Generate new user_id
-            new_user_id = generate_new_id(users_df, "user_id", "U")
-            users_df.loc[len(users_df)] = {
-                "user_id": new_user_id,
-                "name": user_name,
-                "state": "Unknown"  # default, can be extended later
-            }
-            save_data(users_df, USERS_FILE)
-            user_id = new_user_id
+            # The user is only created when the form is submitted, not on every rerun
+            user_id = None
+            existing_id = dims.user_id_by_normalized_name.get(normalize_name(user_name))
+            if existing_id is not None:
+                st.info(f"A user named '{user_name.strip()}' already exists ({existing_id}). "
+                        "Choose 'Existing User' to file under that profile.")
         else:
             st.warning("Please enter a valid name")
             return
 
     # Select product by name
-    product_name = st.selectbox("Select Product", products_df['product_name'])
-    product_row = products_df[products_df['product_name']==product_name].iloc[0]
-    product_id = product_row['product_id']
-    vendor_id = product_row['vendor_id']
+    product_name = st.selectbox("Select Product", dims.product_names)
+    product_id, vendor_id, _ = dims.product(product_name)
 
     # Display vendor name for info
-    vendor_name = vendors_df[vendors_df['vendor_id']==vendor_id]['vendor_name'].values[0]
+    vendor_name = dims.vendor_name[vendor_id]
     st.text(f"Vendor: {vendor_name}")
 
     rating = st.slider("Rating (1-5)", 1, 5, 5)
     review_text = st.text_area("Your Review")
-    review_sentiment = st.selectbox("Sentiment", ["Positive", "Neutral", "Negative"])
 
     if st.button("Submit Review"):
-        new_id = generate_new_id(reviews_df, "review_id", "R")
+        if user_id is None:
+            user_id, _ = get_or_create_user(user_name, st.session_state["session_token"])
+        new_id = allocate_id("reviews")
         new_row = {
             "review_id": new_id,
             "user_id": user_id,
@@ -239,62 +239,155 @@ def page_submit_review():
             "rating": rating,
             "review_text": review_text,
             "review_date": datetime.now(),
-            "review_sentiment": review_sentiment
+            "review_sentiment": None  # filled in by the background scorer
         }
-        reviews_df.loc[len(reviews_df)] = new_row
-        save_data(reviews_df, REVIEWS_FILE)
+        insert_record("reviews", new_row)
+        score_in_background("reviews", new_id, review_text)
         st.success("Review submitted successfully!")
 
 
 # ---------- Track Complaints ----------
+@instrument("page.track_complaints")
 def page_track_complaints():
     st.subheader("📊 Track Complaints")
 
+    # Filters, sorting and paging are evaluated by the backend; only the visible page is sent
+    with st.expander("Filters", expanded=False):
+        f1, f2, f3 = st.columns(3)
+        statuses = f1.multiselect("Status", COMPLAINT_STATUSES)
+        priorities = f2.multiselect("Priority", COMPLAINT_PRIORITIES)
+        vendor_filter = f3.selectbox("Vendor", ["All"] + dims.vendor_names)
+        d1, d2 = st.columns(2)
+        date_from = d1.date_input("From", value=None)
+        date_to = d2.date_input("To", value=None)
+
+    s1, s2, s3 = st.columns(3)
+    sort_by = s1.selectbox("Sort by", COMPLAINT_SORT_COLUMNS)
+    descending = s2.selectbox("Order", ["Descending", "Ascending"]) == "Descending"
+    page_size = s3.selectbox("Rows per page", [25, 50, 100, 250])
+
+    filters = dict(
+        statuses=statuses,
+        priorities=priorities,
+        vendor_id=None if vendor_filter == "All" else dims.vendor_id_by_name[vendor_filter],
+        date_from=date_from,
+        date_to=date_to,
+    )
+    query = dict(filters, sort_by=sort_by, descending=descending, page_size=page_size)
+    # Full-text search ranks by relevance within the same filters and replaces the paged listing
+    search = st.text_input("🔎 Search complaint text", placeholder='e.g. expired, "seal was broken", unhyg*').strip()
+    if search:
+        page_df = search_text("complaints", search, limit=page_size, **filters)
+        total = len(page_df)
+    else:
+        page_number = st.number_input("Page", min_value=1, value=1, step=1)
+        page_df, total = query_complaints(**query, page=int(page_number))
+        page_count = max((total + page_size - 1) // page_size, 1)
+
     # Display complaints with user, product, and vendor names instead of IDs
-    display_df = complaints_df.copy()
-    display_df['user_name'] = display_df['user_id'].map(dict(zip(users_df['user_id'], users_df['name'])))
-    display_df['product_name'] = display_df['product_id'].map(
-        dict(zip(products_df['product_id'], products_df['product_name'])))
-    display_df['vendor_name'] = display_df['vendor_id'].map(
-        dict(zip(vendors_df['vendor_id'], vendors_df['vendor_name'])))
+    with measure("track.name_mapping", rows=len(page_df)):
+        display_df = page_df.copy()
+        display_df['user_name'] = display_df['user_id'].map(dims.user_name)
+        display_df['product_name'] = display_df['product_id'].map(dims.product_name)
+        display_df['vendor_name'] = display_df['vendor_id'].map(dims.vendor_name)
 
     display_df = display_df[['complaint_id', 'user_name', 'product_name', 'vendor_name',
-                             'complaint_text', 'complaint_status', 'complaint_priority', 'complaint_date']]
+                             'snippet' if search else 'complaint_text', 'complaint_status', 'complaint_priority',
+                             'complaint_date']]
 
     # Show the complaints table
+    if search:
+        st.caption(search_caption(page_df, search))
+    else:
+        st.caption(f"{total} complaints match · page {int(page_number)} of {page_count}")
     st.dataframe(display_df)
 
-    # Select a complaint to update
-    selected_id = st.selectbox("Select Complaint to Update Status", display_df['complaint_id'])
-    current_status = complaints_df.loc[complaints_df['complaint_id'] == selected_id, 'complaint_status'].values[0]
+    # Many complaints at once, committed as a single write
+    with st.expander("Bulk Status Update"):
+        scope = st.radio("Apply to", ["Selected complaints on this page",
+                                      "All search results shown" if search else "All complaints matching the filters"])
+        if scope == "Selected complaints on this page":
+            bulk_ids = st.multiselect("Complaints", display_df['complaint_id'].tolist())
+        else:
+            bulk_ids = None
+            st.caption(f"{total} complaints will be updated")
+        bulk_status = st.selectbox("New Status", COMPLAINT_STATUSES, key="bulk_status")
+        if st.button("Apply Status"):
+            if bulk_ids is None and search:
+                bulk_ids = display_df['complaint_id'].tolist()
+            start = time.perf_counter()
+            if bulk_ids is None:
+                # One UPDATE with the same filters, nothing is read first
+                updated = set_matching_complaint_status(bulk_status, **filters)
+            else:
+                updated = set_complaint_status(bulk_ids, bulk_status)
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            st.success(f"Updated {updated} complaints to {bulk_status} in {elapsed:.2f}s "
+                       f"({updated / elapsed:.0f} rows/sec)")
+
+    with st.expander("Bulk Import"):
+        import_table = st.selectbox("Import into", list(BULK_TABLES))
+        spec = BULK_TABLES[import_table]
+        st.caption(f"Required columns: {', '.join(spec['required'])}, product_id or product_name. "
+                   f"Optional: {', '.join([spec['date']] + list(spec['defaults']))}.")
+        upload = st.file_uploader("CSV or Excel file", type=["csv", "xlsx"])
+        if upload is not None and st.button("Import"):
+            start = time.perf_counter()
+            try:
+                rows, errors = validate_batch(import_table, read_upload(upload))
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                new_ids = import_batch(import_table, rows)
+                elapsed = max(time.perf_counter() - start, 1e-6)
+                score_many_in_background(import_table, new_ids, rows[spec['text']])
+                st.success(f"Imported {len(new_ids)} {import_table} in {elapsed:.2f}s "
+                           f"({len(new_ids) / elapsed:.0f} rows/sec)")
+                if not errors.empty:
+                    st.warning(f"{errors['row'].nunique()} rows were skipped")
+                    st.dataframe(errors)
 
-    new_status = st.selectbox("Update Status", ["Pending", "Resolved"], index=0 if current_status == "Pending" else 1)
+    # Select a complaint to update
+    id_search = st.text_input("Search Complaint ID to Update Status", placeholder="e.g. C012")
+    matches = search_ids("complaints", id_search) if id_search.strip() else display_df['complaint_id'].tolist()
+    if not matches:
+        st.info("No complaint matches that ID.")
+        return
+    selected_id = st.selectbox("Select Complaint to Update Status", matches)
+    current_status = get_record("complaints", selected_id)['complaint_status']
+
+    # A legacy label outside COMPLAINT_STATUSES is kept as an option, so it is shown as it is
+    status_options = COMPLAINT_STATUSES + ([current_status] if current_status not in COMPLAINT_STATUSES + [None] else [])
+    new_status = st.selectbox("Update Status", status_options,
+                              index=status_options.index(current_status) if current_status in status_options else 0)
 
     if st.button("Update Status"):
-        complaints_df.loc[complaints_df['complaint_id'] == selected_id, 'complaint_status'] = new_status
-        save_data(complaints_df, COMPLAINTS_FILE)
+        update_record("complaints", selected_id, {"complaint_status": new_status})
         st.success(f"Complaint {selected_id} status updated to {new_status}!")
 
 
+def search_caption(results, search):
+    # Broad searches are ranked over their newest matches only (storage.SEARCH_RANK_WINDOW)
+    window = results.attrs.get("ranked_newest")
+    within = f" among the {window:,} most recent matches" if window else ""
+    return f"{len(results)} best matches for “{search}”{within}"
+
+
 # ---------- Vendor Dashboard ----------
 # ---------- Vendor Dashboard ----------
+@instrument("page.vendor_dashboard")
 def page_vendor_dashboard():
     st.subheader("🏭 Vendor Dashboard")
 
     # Select a vendor
-    vendor_name = st.selectbox("Select Vendor", vendors_df['vendor_name'])
-    vendor_row = vendors_df[vendors_df['vendor_name'] == vendor_name].iloc[0]
-    vendor_id = vendor_row['vendor_id']
-
-    # Filter complaints and reviews
-    vendor_complaints = complaints_df[complaints_df['vendor_id'] == vendor_id]
-    vendor_reviews = reviews_df[reviews_df['vendor_id'] == vendor_id]
+    vendor_name = st.selectbox("Select Vendor", dims.vendor_names)
+    vendor_id = dims.vendor_id_by_name[vendor_name]
 
     # Calculate KPIs
-    total_complaints = vendor_complaints.shape[0]
-    resolved_complaints = vendor_complaints[vendor_complaints['complaint_status'] == 'Resolved'].shape[0]
+    total_complaints = kpi_store.total_complaints(vendor_id)
+    resolved_complaints = kpi_store.complaints_with_status('Resolved', vendor_id)
     pending_complaints = total_complaints - resolved_complaints
-    avg_rating = round(vendor_reviews['rating'].dropna().mean(), 2) if not vendor_reviews.empty else 0
+    avg_rating = kpi_store.avg_rating(vendor_id)
 
     # Compact KPI cards
     kpi_html = f"""
@@ -320,33 +413,77 @@ def page_vendor_dashboard():
     st.markdown(kpi_html, unsafe_allow_html=True)
     st.markdown("---")
 
-    # Detailed complaints and reviews
-    st.subheader("Complaints")
-    if not vendor_complaints.empty:
-        display_complaints = vendor_complaints[['complaint_id', 'user_id', 'product_id', 'complaint_text', 'complaint_status', 'complaint_priority', 'complaint_date']]
-        st.dataframe(display_complaints)
+    # Latest activity for this vendor, served from the recent-activity feed
+    st.subheader("Recent Activity")
+    recent_cols = st.columns(2)
+    recent_vendor_complaints = recent_feed.latest("complaints", RECENT_COUNT, vendor_id)
+    recent_vendor_reviews = recent_feed.latest("reviews", RECENT_COUNT, vendor_id)
+    if not recent_vendor_complaints.empty:
+        recent_cols[0].dataframe(recent_vendor_complaints[['complaint_id', 'complaint_status', 'complaint_date']])
+    else:
+        recent_cols[0].write("No recent complaints.")
+    if not recent_vendor_reviews.empty:
+        recent_cols[1].dataframe(recent_vendor_reviews[['review_id', 'rating', 'review_date']])
     else:
-        st.write("No complaints for this vendor.")
+        recent_cols[1].write("No recent reviews.")
+
+    # Detailed complaints and reviews, a page at a time (see indexes.VendorPartitions)
+    st.subheader("Complaints")
+    vendor_table("complaints", vendor_id, ['complaint_id', 'user_name', 'product_name', 'complaint_status',
+                                           'complaint_priority', 'complaint_date'])
 
     st.subheader("Reviews")
-    if not vendor_reviews.empty:
-        display_reviews = vendor_reviews[['review_id', 'user_id', 'product_id', 'rating', 'review_text', 'review_sentiment', 'review_date']]
-        st.dataframe(display_reviews)
+    vendor_table("reviews", vendor_id, ['review_id', 'user_name', 'product_name', 'rating',
+                                        'review_sentiment', 'review_date'])
+
+
+def vendor_table(table, vendor_id, columns):
+    total = vendor_parts.count(table, vendor_id)
+    if total == 0:
+        st.write(f"No {table} for this vendor.")
+        return
+    c1, c2 = st.columns(2)
+    page_size = c1.selectbox("Rows per page", [10, 25, 50, 100], key=f"{table}_page_size")
+    search = st.text_input(f"Search this vendor's {table}", key=f"{table}_search",
+                           placeholder='e.g. expired, "seal was broken", unhyg*')
+    if search.strip():
+        # Ranked matches from the text index instead of the newest-first page
+        page_df = search_text(table, search, limit=page_size, vendor_id=vendor_id)
+        columns = columns[:1] + ['snippet'] + columns[1:]
+        caption = search_caption(page_df, search.strip())
     else:
-        st.write("No reviews for this vendor.")
+        page_count = (total + page_size - 1) // page_size
+        page_number = min(int(c2.number_input(f"Page (of {page_count})", min_value=1, value=1, step=1,
+                                              key=f"{table}_page")), page_count)
+        page_df = vendor_parts.page(table, vendor_id, page_number, page_size)
+        caption = f"{total} {table} · newest first"
+
+    display_df = page_df.copy()
+    display_df['user_name'] = display_df['user_id'].map(dims.user_name)
+    display_df['product_name'] = display_df['product_id'].map(dims.product_name)
+    st.caption(caption)
+    st.dataframe(display_df[columns], hide_index=True)
+
+    # The full record (text, image, sentiment) is fetched only for the row being viewed
+    key = TABLES[table]["key"]
+    detail_id = st.selectbox("View details", ["—"] + page_df[key].tolist(), key=f"{table}_detail")
+    if detail_id != "—":
+        record = get_record(table, detail_id)
+        st.dataframe(pd.Series(record, name=detail_id).astype(str).to_frame())
 
 
 # ---------- Analytics Page ----------
 import plotly.express as px
 # ---------- Analytics Page ----------
+@instrument("page.analytics")
 def page_analytics():
     st.subheader("📈 Analytics Dashboard")
 
     # KPIs
-    total_complaints = complaints_df.shape[0]
-    resolved_complaints = complaints_df[complaints_df['complaint_status'] == 'Resolved'].shape[0]
+    total_complaints = kpi_store.total_complaints()
+    resolved_complaints = kpi_store.complaints_with_status('Resolved')
     pending_complaints = total_complaints - resolved_complaints
-    avg_rating = round(reviews_df['rating'].mean(), 2) if not reviews_df.empty else 0
+    avg_rating = kpi_store.avg_rating()
     total_users = users_df.shape[0]
     total_vendors = vendors_df.shape[0]
 
@@ -370,76 +507,58 @@ def page_analytics():
 
     st.markdown("---")
 
+    # Charts read from the materialized analytics cube; figures are cached per cube version
+    def top_by_complaints(dim, names):
+        top = analytics_cube.complaint_counts(dim).head(5).rename_axis(dim).reset_index(name='complaints')
+        top['name'] = top[dim].map(names)
+        return top
+
     # Top 5 products by complaints
-    top_products = complaints_df.groupby("product_id").size().sort_values(ascending=False).head(5)
-    top_products = top_products.reset_index().merge(products_df[['product_id', 'product_name']], on='product_id')
-    fig1 = px.bar(top_products, x='product_name', y=0, color='product_name', title="Top 5 Products by Complaints")
+    fig1 = analytics_cube.figure("top_products", lambda: px.bar(
+        top_by_complaints('product_id', dims.product_name), x='name', y='complaints', color='name',
+        labels={'name': 'product_name'}, title="Top 5 Products by Complaints"))
     st.plotly_chart(fig1, use_container_width=True)
 
     # Top 5 vendors by complaints
-    top_vendors = complaints_df.groupby("vendor_id").size().sort_values(ascending=False).head(5)
-    top_vendors = top_vendors.reset_index().merge(vendors_df[['vendor_id', 'vendor_name']], on='vendor_id')
-    fig2 = px.bar(top_vendors, x='vendor_name', y=0, color='vendor_name', title="Top 5 Vendors by Complaints")
+    fig2 = analytics_cube.figure("top_vendors", lambda: px.bar(
+        top_by_complaints('vendor_id', dims.vendor_name), x='name', y='complaints', color='name',
+        labels={'name': 'vendor_name'}, title="Top 5 Vendors by Complaints"))
     st.plotly_chart(fig2, use_container_width=True)
 
     # Top 5 products by average rating
-    if not reviews_df.empty:
-        top_rated = reviews_df.groupby("product_id")['rating'].mean().sort_values(ascending=False).head(5)
-        top_rated = top_rated.reset_index().merge(products_df[['product_id', 'product_name']], on='product_id')
-        fig3 = px.bar(top_rated, x='product_name', y='rating', color='product_name', title="Top 5 Products by Rating")
+    top_rated = analytics_cube.average_ratings('product_id').head(5)
+    if not top_rated.empty:
+        def build_top_rated():
+            df = top_rated.rename_axis('product_id').reset_index(name='rating')
+            df['product_name'] = df['product_id'].map(dims.product_name)
+            return px.bar(df, x='product_name', y='rating', color='product_name', title="Top 5 Products by Rating")
+        fig3 = analytics_cube.figure("top_rated", build_top_rated)
         st.plotly_chart(fig3, use_container_width=True)
 
+    # ----------------- Trends & Drill-down -----------------
+    st.markdown("---")
+    drill_vendor = st.selectbox("Drill down by vendor", ["All Vendors"] + dims.vendor_names)
+    filters = {} if drill_vendor == "All Vendors" else {"vendor_id": dims.vendor_id_by_name[drill_vendor]}
 
-# ---------- Chatbot Page ----------
+    def build_trend():
+        daily = analytics_cube.complaint_counts("day", **filters).sort_index()
+        df = daily.rename_axis('day').reset_index(name='complaints')
+        return px.line(df, x='day', y='complaints', markers=True, title=f"Complaints per Day · {drill_vendor}")
+    st.plotly_chart(analytics_cube.figure(("trend", drill_vendor), build_trend), use_container_width=True)
 
-# ---------- Chatbot FAQs ----------
-faq = {
-    # English
-    "en": {
-        "hello": "Hello! How can I help you today?",
-        "hi": "Hi there! How can I assist you?",
-        "help": "You can submit complaints, reviews, track complaints, view analytics, or get vendor info.",
-        "submit complaint": "Go to 'Submit Complaint' page to lodge a new complaint.",
-        "submit review": "Go to 'Submit Review' page to add a product review.",
-        "track complaints": "Go to 'Track Complaints' page to see complaint status.",
-        "vendor dashboard": "Go to 'Vendor Dashboard' page to see vendor stats.",
-        "analytics": "Go to 'Analytics' page to view KPIs and charts.",
-        "quick stats": "Total complaints, resolved complaints, pending complaints, avg. ratings, total users, total vendors.",
-        "thank you": "You're welcome!",
-        "bye": "Goodbye! Have a great day!"
-    },
-
-    # Hindi
-    "hi": {
-        "hello": "नमस्ते! मैं आपकी कैसे मदद कर सकता हूँ?",
-        "hi": "हाय! मैं आपकी कैसे सहायता करूँ?",
-        "help": "आप शिकायत दर्ज कर सकते हैं, समीक्षा जोड़ सकते हैं, शिकायतें ट्रैक कर सकते हैं, एनालिटिक्स देख सकते हैं, या विक्रेता जानकारी प्राप्त कर सकते हैं।",
-        "submit complaint": "नया शिकायत दर्ज करने के लिए 'Submit Complaint' पेज पर जाएँ।",
-        "submit review": "उत्पाद समीक्षा जोड़ने के लिए 'Submit Review' पेज पर जाएँ।",
-        "track complaints": "'Track Complaints' पेज पर जाकर शिकायत स्थिति देखें।",
-        "vendor dashboard": "'Vendor Dashboard' पेज पर जाकर विक्रेता आँकड़े देखें।",
-        "analytics": "KPIs और चार्ट देखने के लिए 'Analytics' पेज पर जाएँ।",
-        "quick stats": "कुल शिकायतें, हल की गई शिकायतें, लंबित शिकायतें, औसत रेटिंग, कुल उपयोगकर्ता, कुल विक्रेता।",
-        "thank you": "आपका स्वागत है!",
-        "bye": "अलविदा! आपका दिन शुभ हो!"
-    }
-}
-
-
-def chatbot_response(user_input, lang="en"):
-    user_input = user_input.lower()
-
-    # Match keywords in FAQ
-    for key in faq[lang].keys():
-        if key in user_input:
-            return faq[lang][key]
-
-    # Default response if no match
-    if lang == "hi":
-        return "माफ़ कीजिये, मैं इसे समझ नहीं पाया। कृपया पुनः प्रयास करें।"
-    return "Sorry, I didn't understand that. Please try again."
+    breakdown_cols = st.columns(2)
+    for col, dim, title in [(breakdown_cols[0], "complaint_status", "By Status"),
+                            (breakdown_cols[1], "complaint_priority", "By Priority")]:
+        def build_breakdown(dim=dim, title=title):
+            counts = analytics_cube.complaint_counts(dim, **filters)
+            df = counts.rename_axis(dim).reset_index(name='complaints')
+            return px.pie(df, names=dim, values='complaints', title=f"{title} · {drill_vendor}")
+        col.plotly_chart(analytics_cube.figure((dim, drill_vendor), build_breakdown), use_container_width=True)
 
 
+# ---------- Chatbot Page ----------
+
+@instrument("page.chatbot")
 def page_chatbot():
     st.subheader("💬 Chatbot Support")
 
@@ -467,6 +586,7 @@ def page_chatbot():
             st.warning("Please type a question / कृपया एक प्रश्न टाइप करें")
 
 
+@instrument("page.powerbi")
 def page_powerbi():
     st.subheader("📊 Power BI Dashboard")
 
@@ -499,8 +619,71 @@ def page_powerbi():
     except Exception as e:
         st.error(f"Error displaying dashboard: {e}")
 
+    # Data for the reports, built when the button is clicked; big exports are left to the CLI
+    st.markdown("### 📥 Export Data")
+    e1, e2, e3 = st.columns(3)
+    export_table = e1.selectbox("Table", EXPORT_TABLES)
+    export_format = e2.selectbox("Format", list(EXPORT_FORMATS))
+    export_vendor = e3.selectbox("Vendor", ["All"] + dims.vendor_names, key="export_vendor")
+    d1, d2, d3 = st.columns(3)
+    export_from = d1.date_input("From", value=None, key="export_from")
+    export_to = d2.date_input("To", value=None, key="export_to")
+    export_statuses = d3.multiselect("Status", COMPLAINT_STATUSES, key="export_statuses",
+                                     disabled=export_table != "complaints")
+    filters = dict(
+        vendor_id=None if export_vendor == "All" else dims.vendor_id_by_name[export_vendor],
+        date_from=export_from,
+        date_to=export_to,
+    )
+    if export_table == "complaints":
+        filters["statuses"] = export_statuses
+    export_rows = count_rows(export_table, **filters)
+    if export_rows > EXPORT_UI_MAX_ROWS:
+        st.warning(f"{export_rows:,} rows match, more than the {EXPORT_UI_MAX_ROWS:,} the app can serve. Narrow the "
+                   f"filters, or run `python export.py full {export_table} out.{export_format}` on the server.")
+    st.download_button(
+        f"Download {export_table} ({export_rows:,} rows)",
+        data=export_download(export_table, export_format, **filters),
+        file_name=export_file_name(export_table, export_format),
+        mime=EXPORT_FORMATS[export_format],
+        on_click="ignore",
+        disabled=export_rows > EXPORT_UI_MAX_ROWS,
+    )
+
+    with st.expander("Incremental Exports"):
+        st.caption("`python export.py changes <dir>` (or FEEDBACK_EXPORT_DIR) writes only the rows "
+                   "added or changed since the previous run, for cheap Power BI refreshes.")
+        st.dataframe(export_runs(), hide_index=True)
+
+
+# ---------- Metrics Page (admin) ----------
+def page_metrics():
+    st.subheader("⏱️ Metrics")
+    st.caption(f"Since {datetime.fromtimestamp(registry.started):%Y-%m-%d %H:%M:%S}, this server process only")
+
+    table = registry.table().sort_values("total_ms", ascending=False)
+    if table.empty:
+        st.info("Nothing recorded yet (instrumentation is off when FEEDBACK_METRICS=0).")
+    else:
+        page_times = table[table['operation'].str.startswith("page.")]
+        st.markdown("**Pages**")
+        st.bar_chart(page_times.set_index('operation')['mean_ms'])
+        st.markdown("**Operations**")
+        st.dataframe(table, hide_index=True)
+
+    st.markdown("**Table cache**")
+    st.dataframe(pd.DataFrame(table_cache.stats()).T)
+
+    c1, c2 = st.columns(2)
+    c1.download_button("Download Prometheus metrics", registry.prometheus_text(),
+                       file_name="feedback_metrics.prom", mime="text/plain")
+    if c2.button("Reset Metrics"):
+        registry.reset()
+        st.rerun()
+
+
 # ---------- Sidebar ----------
-page = st.sidebar.selectbox("Go to", [
+pages = [
     "Home",
     "Submit Complaint",
     "Submit Review",
@@ -509,7 +692,10 @@ page = st.sidebar.selectbox("Go to", [
     "Analytics",
     "Chatbot",
     "Power BI"
-])
+]
+if st.session_state.get("is_admin"):
+    pages.append("Metrics")
+page = st.sidebar.selectbox("Go to", pages)
 
 # ---------- Page Routing ----------
 if page == "Home":
@@ -527,4 +713,6 @@ elif page == "Analytics":
 elif page == "Chatbot":
     page_chatbot()
 elif page == "Power BI":
-    page_powerbi()
\ No newline at end of file
+    page_powerbi()
+elif page == "Metrics":
+    page_metrics()
\ No newline at end of file
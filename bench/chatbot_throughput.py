@@ -0,0 +1,74 @@
+# bench/chatbot_throughput.py
+# Queries/sec of the indexed intent matcher vs the old linear substring scan, on the built-in FAQ
+# and on a synthetic FAQ with thousands of entries.
+#
+#   python bench/chatbot_throughput.py [n_entries] [n_queries]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import faq, IntentMatcher  # noqa: E402
+
+WORDS = ["refund", "delivery", "order", "status", "vendor", "product", "invoice", "payment", "expired",
+         "damaged", "packaging", "fssai", "rating", "review", "complaint", "account", "address", "return",
+         "replace", "cancel", "price", "offer", "discount", "quality", "stock", "warranty", "support"]
+
+
+def legacy_response(entries, user_input):
+    # The pre-index chatbot_response: first key (in dict order) contained anywhere in the input
+    user_input = user_input.lower()
+    for key in entries.keys():
+        if key in user_input:
+            return entries[key]
+    return None
+
+
+def synthetic_faq(n, seed=11):
+    rng = random.Random(seed)
+    entries = dict(faq["en"])
+    while len(entries) < n:
+        key = " ".join(rng.sample(WORDS, rng.randint(2, 3))) + f" {len(entries)}"
+        entries[key] = f"answer {len(entries)}"
+    return entries
+
+
+def synthetic_queries(entries, n, seed=5):
+    rng = random.Random(seed)
+    keys = list(entries)
+    queries = []
+    for _ in range(n):
+        if rng.random() < 0.7:
+            queries.append(f"hi, can you tell me about {rng.choice(keys)} please")
+        else:
+            queries.append(" ".join(rng.choices(WORDS, k=8)))
+    return queries
+
+
+def bench(label, entries, queries):
+    matcher = IntentMatcher(entries)
+    results = []
+    for name, fn in [("legacy scan", lambda q: legacy_response(entries, q)),
+                     ("trie matcher", lambda q: matcher.match(q)),
+                     ("trie matcher (fuzzy fallback)", lambda q: matcher.match(q, fuzzy=True))]:
+        start = time.perf_counter()
+        for q in queries:
+            fn(q)
+        elapsed = time.perf_counter() - start
+        results.append((name, len(queries) / elapsed))
+    for name, qps in results:
+        print(f"{label:<22} {len(entries):>6} keys  {name:<30} {qps:>12.0f} queries/sec")
+
+
+def main():
+    n_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    bench("built-in FAQ", faq["en"], synthetic_queries(faq["en"], n_queries))
+    entries = synthetic_faq(n_entries)
+    bench("synthetic FAQ", entries, synthetic_queries(entries, n_queries // 10))
+
+
+if __name__ == "__main__":
+    main()
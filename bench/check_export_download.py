@@ -0,0 +1,92 @@
+# bench/check_export_download.py
+# Drives the Power BI page headlessly and clicks the Export Data download button for every table
+# and format the way the browser does: Streamlit runs the button's deferred callable and serves
+# what it returns. Checks that each file comes back whole, and that an export above the in-app
+# row cap is refused with a pointer to the CLI instead of being built in memory.
+#
+#   python bench/check_export_download.py               (set FEEDBACK_BACKEND=excel to check that backend)
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    work = tempfile.mkdtemp()
+    os.makedirs(os.path.join(work, "Data"))
+    for path in glob.glob(os.path.join(ROOT, "Data", "*.xlsx")):
+        shutil.copy(path, os.path.join(work, "Data"))
+    os.chdir(work)
+
+    import pandas as pd
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.testing.v1 import AppTest
+    import export
+    import storage
+    from export import EXPORT_FORMATS, EXPORT_TABLES
+
+    # AppTest's media file manager only lives during a run; keep hold of it to "click" later
+    deferred = {}
+    add_deferred = MediaFileManager.add_deferred
+
+    def record(self, *args, **kwargs):
+        file_id = add_deferred(self, *args, **kwargs)
+        deferred[file_id] = self
+        return file_id
+
+    MediaFileManager.add_deferred = record
+
+    def power_bi():
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+        at.run()
+        at.sidebar.selectbox[0].set_value("Power BI").run()
+        return at
+
+    def click(at):
+        # What Streamlit does when the browser requests the file
+        file_id = at.get("download_button")[0].proto.deferred_file_id
+        manager = deferred[file_id]
+        url = manager.execute_deferred(file_id)
+        return manager._storage.get_file(url.rsplit("/", 1)[-1]).content
+
+    failures = []
+    at = power_bi()
+    for table in EXPORT_TABLES:
+        for fmt in EXPORT_FORMATS:
+            next(s for s in at.selectbox if s.label == "Table").set_value(table)
+            next(s for s in at.selectbox if s.label == "Format").set_value(fmt).run()
+            expected = len(storage.load_data(table))
+            try:
+                data = click(at)
+            except Exception as e:
+                failures.append(f"{table}.{fmt}: {e}")
+                continue
+            df = pd.read_parquet(io.BytesIO(data)) if fmt == "parquet" else pd.read_csv(io.BytesIO(data))
+            print(f"{table}.{fmt}: {len(data):,} bytes, {len(df)} rows (expected {expected})")
+            if len(df) != expected:
+                failures.append(f"{table}.{fmt}: {len(df)} rows, expected {expected}")
+
+    # Above the cap the button is disabled and the page says how to export instead
+    export.UI_MAX_ROWS = 10
+    at = power_bi()
+    button = at.get("download_button")[0]
+    warned = any("python export.py full" in w.value for w in at.warning)
+    print(f"over the cap: button disabled {button.proto.disabled}, CLI pointer shown {warned}")
+    if not (button.proto.disabled and warned):
+        failures.append("over the cap: the download is still offered")
+
+    failures += [f"exception: {e.value}" for e in at.exception]
+    print(f"backend: {storage.STORAGE_BACKEND}")
+    for failure in failures:
+        print(f"FAILED {failure}")
+    print("OK" if not failures else "FAILED")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
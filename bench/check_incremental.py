@@ -0,0 +1,180 @@
+# bench/check_incremental.py
+# Randomized check of the incrementally maintained structures: after a run of mixed writes
+# (inserts, status/priority/rating edits, vendor and date moves, batched and filtered updates), half of them
+# made by other processes and replayed by sync_changes and some landing while the structures
+# are being built, the KPI store, the recent-activity feed, the analytics cube and the dimension
+# index kept up to date through storage's change notifications must answer exactly like fresh
+# copies rebuilt from the tables.
+#
+#   python bench/check_incremental.py [writes] [n_complaints]     (default 300 5000)
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_mix(count, seed):
+    # `count` random writes through storage, as the pages and the bulk tools make them
+    import pandas as pd
+
+    import storage
+
+    rng = random.Random(seed)
+    vendors = storage.load_data("vendors")["vendor_id"].tolist()
+    products = storage.load_data("products")["product_id"].tolist()
+    complaint_ids = storage.load_data("complaints")["complaint_id"].tolist()
+    review_ids = storage.load_data("reviews")["review_id"].tolist()
+    start, end = pd.Timestamp("2023-01-01"), pd.Timestamp("2025-12-31")
+
+    def some_date():
+        return start + pd.Timedelta(seconds=rng.randrange(int((end - start).total_seconds())))
+
+    def insert_complaint():
+        complaint_id = storage.allocate_id("complaints")
+        storage.insert_record("complaints", {
+            "complaint_id": complaint_id, "user_id": "U001", "product_id": rng.choice(products),
+            "vendor_id": rng.choice(vendors), "complaint_text": "check", "complaint_date": some_date(),
+            "complaint_status": rng.choice(storage.COMPLAINT_STATUSES),
+            "complaint_priority": rng.choice(storage.COMPLAINT_PRIORITIES),
+        })
+        complaint_ids.append(complaint_id)
+
+    def insert_review():
+        review_id = storage.allocate_id("reviews")
+        storage.insert_record("reviews", {
+            "review_id": review_id, "user_id": "U001", "product_id": rng.choice(products),
+            "vendor_id": rng.choice(vendors), "rating": rng.randint(1, 5), "review_text": "check",
+            "review_date": some_date(),
+        })
+        review_ids.append(review_id)
+
+    operations = [
+        insert_complaint,
+        insert_review,
+        lambda: storage.update_record("complaints", rng.choice(complaint_ids),
+                                      {"complaint_status": rng.choice(storage.COMPLAINT_STATUSES)}),
+        lambda: storage.update_record("complaints", rng.choice(complaint_ids),
+                                      {"complaint_priority": rng.choice(storage.COMPLAINT_PRIORITIES)}),
+        lambda: storage.update_record("complaints", rng.choice(complaint_ids), {"vendor_id": rng.choice(vendors)}),
+        lambda: storage.update_record("complaints", rng.choice(complaint_ids), {"complaint_date": some_date()}),
+        lambda: storage.update_record("reviews", rng.choice(review_ids), {"rating": rng.randint(1, 5)}),
+        lambda: storage.update_record("reviews", rng.choice(review_ids), {"vendor_id": rng.choice(vendors)}),
+        lambda: storage.update_record("reviews", rng.choice(review_ids), {"review_date": some_date()}),
+        lambda: storage.update_records("complaints", {
+            cid: {"complaint_status": rng.choice(storage.COMPLAINT_STATUSES)} for cid in rng.sample(complaint_ids, 20)
+        }),
+        lambda: storage.update_matching("complaints", {"complaint_status": rng.choice(storage.COMPLAINT_STATUSES)},
+                                        vendor_id=rng.choice(vendors),
+                                        priorities=[rng.choice(storage.COMPLAINT_PRIORITIES)]),
+    ]
+    for _ in range(count):
+        rng.choice(operations)()
+
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    n = int(float(sys.argv[2])) if len(sys.argv) > 2 else 5_000
+    scratch = tempfile.mkdtemp()
+    os.chdir(scratch)
+    os.makedirs("Data")
+    os.environ["FEEDBACK_DB"] = os.path.join(scratch, "Data", "bench.db")
+    import pandas as pd
+
+    import aggregates
+    import indexes
+    import storage
+    from aggregates import AnalyticsCube, KpiStore, RecentFeed, get_analytics_cube, get_kpi_store, get_recent_feed
+    from synthetic import populate
+
+    populate(n)
+    storage.sync_changes()
+
+    # Writes between the table reads of every build: the build has read some tables before them
+    def load_then_write(table):
+        df = storage.load_data(table)
+        write_mix(10, len(table))
+        return df
+
+    aggregates.load_data = load_then_write
+    kpis, feed, cube = get_kpi_store(), get_recent_feed(), get_analytics_cube()
+    aggregates.load_data = storage.load_data
+
+    def load_then_add_vendor(table):
+        df = storage.load_data(table)
+        storage.insert_record("vendors", {"vendor_id": f"V-{table}", "vendor_name": f"Check {table}"})
+        return df
+
+    indexes.load_data = load_then_add_vendor
+    dims = indexes.get_dimension_index()
+    indexes.load_data = storage.load_data
+    vendors = storage.load_data("vendors")["vendor_id"].tolist()
+    products = storage.load_data("products")["product_id"].tolist()
+
+    # Every other batch is written by another process and reaches this one through
+    # sync_changes only, as with several server processes
+    ctx = multiprocessing.get_context("spawn")
+    rng = random.Random(11)
+    batch = 30
+    for i, done in enumerate(range(0, writes, batch)):
+        count = min(batch, writes - done)
+        if i % 2:
+            other = ctx.Process(target=write_mix, args=(count, i))
+            other.start()
+            other.join()
+        else:
+            write_mix(count, i)
+        storage.sync_changes()
+        # Reads in between, as page views would do
+        feed.latest("complaints", 5, rng.choice(vendors))
+        cube.complaint_counts("day", vendor_id=rng.choice(vendors))
+
+    if (get_kpi_store(), get_recent_feed(), get_analytics_cube()) != (kpis, feed, cube):
+        print("A structure was reset instead of updated")
+        sys.exit(1)
+    fresh_kpis, fresh_feed, fresh_cube = KpiStore(), RecentFeed(), AnalyticsCube()
+    mismatches = []
+
+    def compare(label, incremental, rebuilt):
+        if isinstance(incremental, pd.Series):
+            same = incremental.sort_index().equals(rebuilt.sort_index())
+        else:
+            same = incremental == rebuilt
+        if not same:
+            mismatches.append(label)
+
+    for vendor_id in [None] + vendors:
+        compare(f"kpi total {vendor_id}", kpis.total_complaints(vendor_id), fresh_kpis.total_complaints(vendor_id))
+        for status in storage.COMPLAINT_STATUSES:
+            compare(f"kpi {status} {vendor_id}", kpis.complaints_with_status(status, vendor_id),
+                    fresh_kpis.complaints_with_status(status, vendor_id))
+        compare(f"kpi rating {vendor_id}", kpis.avg_rating(vendor_id), fresh_kpis.avg_rating(vendor_id))
+        for table, key in (("complaints", "complaint_id"), ("reviews", "review_id")):
+            compare(f"feed {table} {vendor_id}", feed.latest(table, feed.capacity, vendor_id)[key].tolist(),
+                    fresh_feed.latest(table, fresh_feed.capacity, vendor_id)[key].tolist())
+    for by in ("product_id", "vendor_id", "complaint_priority", "complaint_status", "day"):
+        compare(f"cube {by}", cube.complaint_counts(by), fresh_cube.complaint_counts(by))
+        for vendor_id in rng.sample(vendors, 10):
+            compare(f"cube {by} vendor {vendor_id}", cube.complaint_counts(by, vendor_id=vendor_id),
+                    fresh_cube.complaint_counts(by, vendor_id=vendor_id))
+        for product_id in rng.sample(products, 10):
+            compare(f"cube {by} product {product_id}", cube.complaint_counts(by, product_id=product_id),
+                    fresh_cube.complaint_counts(by, product_id=product_id))
+    fresh_dims = indexes.DimensionIndex(storage.load_data("users"), storage.load_data("vendors"),
+                                        storage.load_data("products"))
+    compare("dimension index vendors", dims.vendor_name, fresh_dims.vendor_name)
+    for by in ("product_id", "vendor_id"):
+        compare(f"cube ratings {by}", cube.average_ratings(by).round(9), fresh_cube.average_ratings(by).round(9))
+
+    print(f"{writes} mixed writes over {n:,} complaints: {len(mismatches)} mismatches")
+    for label in mismatches[:20]:
+        print(f"  MISMATCH {label}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# bench/check_user_reruns.py
+# Drives the Submit Complaint page headlessly in "New User" mode and checks that reruns never
+# create users or touch the users data, and that submitting twice creates the user exactly once.
+#
+#   python bench/check_user_reruns.py [reruns]          (set FEEDBACK_BACKEND=excel to check that backend)
+import glob
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+    work = tempfile.mkdtemp()
+    os.makedirs(os.path.join(work, "Data"))
+    for path in glob.glob(os.path.join(ROOT, "Data", "*.xlsx")):
+        shutil.copy(path, os.path.join(work, "Data"))
+    os.chdir(work)
+
+    from streamlit.testing.v1 import AppTest
+    import storage
+
+    def users_footprint():
+        if storage.STORAGE_BACKEND == "excel":
+            paths = [storage.USERS_FILE, storage.WRITE_LOG_FILE]
+        else:
+            # Fold the sqlite WAL into the main file so sizes are comparable between samples
+            storage.get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            paths = [storage.DB_FILE, storage.DB_FILE + "-wal"]
+        return len(storage.load_data("users")), [os.path.getsize(p) if os.path.exists(p) else 0 for p in paths]
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.run()
+    at.sidebar.selectbox[0].set_value("Submit Complaint").run()
+    at.radio[0].set_value("New User").run()
+    at.text_input[0].input("Test  Person").run()
+    before = users_footprint()
+    for i in range(reruns):
+        at.text_area[0].input(f"draft {i}").run()
+    after_reruns = users_footprint()
+    at.button[0].click().run()
+    at.button[0].click().run()
+    rows_after_submit = len(storage.load_data("users"))
+
+    print(f"backend: {storage.STORAGE_BACKEND}")
+    print(f"users rows/file sizes before {reruns} reruns: {before}, after: {after_reruns}")
+    print(f"users rows after submitting twice: {rows_after_submit} (expected {before[0] + 1})")
+    ok = before == after_reruns and rows_after_submit == before[0] + 1 and not at.exception
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# bench/check_write_log.py
+# Checks of the excel backend's write log against a scratch copy of synthetic workbooks: writes
+# replayed over the workbook must load and compact whatever the workbook's column types, and
+# the log must drain; a table saved while a compaction is running must not be overwritten by it.
+# A workbook edited outside the app must reach what was built from it at the next sync.
+#
+#   python bench/check_write_log.py
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    work = tempfile.mkdtemp()
+    os.makedirs(os.path.join(work, "Data"))
+    os.chdir(work)
+    os.environ["FEEDBACK_BACKEND"] = "excel"
+    os.environ["FEEDBACK_DB"] = os.path.join(work, "Data", "bench.db")
+    import pandas as pd
+
+    import storage
+    from snapshots import snapshot_path
+    from synthetic import write_workbooks
+
+    write_workbooks(200, "Data")
+    failures = []
+
+    def check(label, ok):
+        print(f"{'ok    ' if ok else 'FAILED'} {label}")
+        if not ok:
+            failures.append(label)
+
+    def from_workbook():
+        # As after a restart with the Arrow snapshot gone: the workbook is read with read_excel
+        for table in storage.TABLES:
+            path = snapshot_path(storage.TABLES[table]["file"])
+            if os.path.exists(path):
+                os.remove(path)
+        storage.table_cache.invalidate()
+        return storage.load_data("complaints").set_index("complaint_id")
+
+    # Columns that are empty in the workbook (sentiment before scoring, image urls) read back
+    # as float64; the first text written into them must still replay
+    path = storage.TABLES["complaints"]["file"]
+    df = pd.read_excel(path)
+    df["complaint_sentiment"] = None
+    df["complaint_image_url"] = None
+    df.to_excel(path, index=False)
+
+    complaint_id = storage.allocate_id("complaints")
+    storage.insert_record("complaints", {
+        "complaint_id": complaint_id, "user_id": "U001", "product_id": "P001", "vendor_id": "V001",
+        "complaint_text": "check", "complaint_date": pd.Timestamp.now(), "complaint_status": "Pending",
+        "complaint_priority": "Low",
+    })
+    storage.compact_write_log()
+    storage.update_record("complaints", complaint_id,
+                          {"complaint_sentiment": "Negative", "complaint_image_url": "https://example.com/a.jpg"})
+    try:
+        row = from_workbook().loc[complaint_id]
+        check("text replayed into empty workbook columns", row["complaint_sentiment"] == "Negative")
+    except Exception as e:
+        check(f"text replayed into empty workbook columns ({e})", False)
+    try:
+        storage.compact_write_log()
+        check("compaction drained the log", not storage.write_log.entries())
+        check("compacted workbook holds the text", from_workbook().loc[complaint_id, "complaint_sentiment"] == "Negative")
+    except Exception as e:
+        check(f"compaction of text into empty workbook columns ({e})", False)
+
+    # save_data while a compaction that has already read the old workbook is still running
+    storage.update_record("complaints", complaint_id, {"complaint_status": "Resolved"})
+    read, resume = threading.Event(), threading.Event()
+
+    def slow_fold(entries):
+        # _fold_log with a pause between reading the workbooks and writing them back
+        tables = {entry["table"] for entry in entries}
+        frames = {table: storage._read_workbook(table) for table in tables}
+        read.set()
+        resume.wait(10)
+        for table in tables:
+            storage._write_workbook(table, storage._replay(table, frames[table],
+                                                           [e for e in entries if e["table"] == table]))
+
+    compaction = threading.Thread(target=storage.write_log.compact, args=(slow_fold,))
+    compaction.start()
+    read.wait(10)
+    saved = from_workbook().reset_index().head(50)
+    save = threading.Thread(target=storage.save_data, args=(saved, "complaints"))
+    save.start()
+    time.sleep(0.5)
+    resume.set()
+    compaction.join()
+    save.join()
+    check("save_data during a compaction is kept", len(from_workbook()) == len(saved))
+
+    # The workbook edited and saved outside the app
+    from aggregates import get_kpi_store
+    storage.compact_write_log()
+    storage.sync_changes()
+    get_kpi_store()
+    edited = pd.read_excel(path).head(20)
+    edited.to_excel(path, index=False)
+    storage.sync_changes()
+    counted = len(get_kpi_store()._complaints)
+    check(f"external edit reaches the KPI store ({counted} complaints counted, {len(edited)} in the workbook)",
+          counted == len(edited))
+
+    print("OK" if not failures else "FAILED")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
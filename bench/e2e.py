@@ -0,0 +1,219 @@
+# bench/e2e.py
+# Headless end-to-end benchmark of the app's data paths. For each scale a fresh process fills a
+# scratch database with synthetic data (bench/synthetic.py) and times the data work behind every
+# page, without Streamlit: table loads, id allocation, the KPI/recent/cube structures, the
+# complaint queries, name mapping and text search, the vendor pages (also right after a write),
+# submits, bulk import and the chatbot.
+# Writes a JSON report; with --baseline, exits 1 when a step got slower than the tolerance allows.
+#
+#   python bench/e2e.py [--scales 1000,10000,100000] [--backend sqlite|excel] [--out report.json]
+#                       [--baseline previous.json] [--tolerance 0.5]
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CHATBOT_QUERIES = ["hello", "how do I submit a complaint", "track complaints please", "analytics",
+                   "vendr dashbord", "what are the quick stats", "thank you", "something unrelated"]
+# Steps faster than this are noise, whatever their relative change
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def run_scale(n, backend, seed, results):
+    scratch = tempfile.mkdtemp()
+    os.chdir(scratch)
+    os.environ["FEEDBACK_DB"] = os.path.join(scratch, "Data", "bench.db")
+    os.environ["FEEDBACK_BACKEND"] = backend
+    os.makedirs("Data")
+    import storage
+    from synthetic import populate, write_workbooks
+
+    steps = []
+
+    def step(name, fn, rows=None, repeat=1):
+        # Best of `repeat` runs; cold steps run once
+        best, result = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        entry = {"step": name, "seconds": round(best, 6)}
+        if rows:
+            entry["rows"] = rows
+            entry["rows_per_sec"] = round(rows / best) if best else None
+        steps.append(entry)
+        return result
+
+    if backend == "excel":
+        sizes = step("setup.write_workbooks", lambda: write_workbooks(n, "Data", seed), rows=n)
+    else:
+        sizes = step("setup.populate", lambda: populate(n, seed), rows=n)
+
+    # ----- load_data -----
+    for table in storage.TABLES:
+        step(f"load_data.cold.{table}", lambda: storage.load_data(table), rows=sizes[table])
+    step("load_data.warm", lambda: [storage.load_data(t) for t in storage.TABLES], repeat=5)
+    step("sync_changes", storage.sync_changes, repeat=5)
+    step("allocate_id", lambda: [storage.allocate_id("complaints") for _ in range(100)], rows=100)
+
+    from aggregates import get_analytics_cube, get_kpi_store, get_recent_feed
+    from chatbot import chatbot_response
+    from indexes import get_dimension_index, get_vendor_partitions
+
+    # ----- Home -----
+    kpis = step("home.kpi_store.build", get_kpi_store, rows=sizes["complaints"] + sizes["reviews"])
+    step("home.kpis", lambda: (kpis.total_complaints(), kpis.complaints_with_status("resolved"),
+                               kpis.complaints_with_status("pending"), kpis.avg_rating()), repeat=5)
+    feed = step("home.recent_feed.build", get_recent_feed, rows=sizes["complaints"] + sizes["reviews"])
+    step("home.recent_complaints", lambda: feed.latest("complaints", 5), repeat=5)
+
+    # ----- Track Complaints -----
+    dims = step("track.dimension_index.build", get_dimension_index,
+                rows=sizes["users"] + sizes["vendors"] + sizes["products"])
+    page_df, _ = step("track.query_first_page", lambda: storage.query_complaints(
+        statuses=["Open", "In Progress"], priorities=["High", "Urgent"], page=1, page_size=50), repeat=3)
+    step("track.query_deep_page", lambda: storage.query_complaints(
+        sort_by="complaint_priority", descending=False, page=100, page_size=50), repeat=3)
+
+    def name_mapping():
+        display_df = page_df.copy()
+        display_df["user_name"] = display_df["user_id"].map(dims.user_name)
+        display_df["product_name"] = display_df["product_id"].map(dims.product_name)
+        display_df["vendor_name"] = display_df["vendor_id"].map(dims.vendor_name)
+        return display_df
+
+    step("track.name_mapping", name_mapping, rows=len(page_df), repeat=5)
+    step("track.search_ids", lambda: storage.search_ids("complaints", "C12"), repeat=5)
+    step("track.search_text", lambda: storage.search_text("complaints", "expired", statuses=["Open", "In Progress"]),
+         repeat=5)
+
+    # ----- Vendor Dashboard (busiest vendor) -----
+    complaints = storage.load_data("complaints")
+    vendor_id = complaints["vendor_id"].value_counts().index[0]
+    step("vendor.kpis", lambda: (kpis.total_complaints(vendor_id), kpis.complaints_with_status("Resolved", vendor_id),
+                                 kpis.avg_rating(vendor_id)), repeat=5)
+    step("vendor.recent", lambda: (feed.latest("complaints", 5, vendor_id), feed.latest("reviews", 5, vendor_id)), repeat=5)
+
+    parts = get_vendor_partitions()
+    step("vendor.partitions.build", lambda: (parts.count("complaints", vendor_id), parts.count("reviews", vendor_id)),
+         rows=sizes["complaints"] + sizes["reviews"])
+
+    def vendor_tables():
+        return parts.page("complaints", vendor_id, 1, 25), parts.page("reviews", vendor_id, 1, 25)
+
+    step("vendor.tables", vendor_tables, rows=int((complaints["vendor_id"] == vendor_id).sum()), repeat=3)
+
+    # ----- Analytics -----
+    cube = step("analytics.cube.build", get_analytics_cube, rows=sizes["complaints"] + sizes["reviews"])
+    step("analytics.top_products", lambda: cube.complaint_counts("product_id").head(5), repeat=3)
+    step("analytics.top_vendors", lambda: cube.complaint_counts("vendor_id").head(5), repeat=3)
+    step("analytics.top_rated", lambda: cube.average_ratings("product_id").head(5), repeat=3)
+    step("analytics.vendor_trend", lambda: cube.complaint_counts("day", vendor_id=vendor_id), repeat=3)
+
+    # ----- Writes, with every derived structure live -----
+    product = dims.product(dims.product_names[0])
+    user_id = dims.user_id_by_name[dims.user_names[0]]
+
+    def submit(i):
+        new_id = storage.allocate_id("complaints")
+        storage.insert_record("complaints", {
+            "complaint_id": new_id, "user_id": user_id, "product_id": product[0], "vendor_id": product[1],
+            "fssai_code": product[2], "complaint_text": f"bench {i}", "complaint_status": "Pending",
+            "complaint_priority": "Low", "complaint_date": datetime.now(), "complaint_image_url": "",
+        })
+        return new_id
+
+    submitted = step("submit.insert_record", lambda: [submit(i) for i in range(20)], rows=20)
+    step("submit.update_record",
+         lambda: [storage.update_record("complaints", cid, {"complaint_status": "Resolved"}) for cid in submitted], rows=20)
+
+    # The dashboard's next rerun right after a single write: the first read after it is the one timed
+    vendor_complaint = storage.query_complaints(vendor_id=vendor_id, page_size=1)[0]["complaint_id"][0]
+    submit(20)
+    step("vendor.tables.after_insert", vendor_tables)
+    storage.update_record("complaints", vendor_complaint, {"complaint_status": "Resolved"})
+    step("vendor.tables.after_update", vendor_tables)
+
+    from bulk import import_batch, validate_batch
+    from synthetic import dimensions, fact_chunks
+
+    upload = next(fact_chunks("complaints", 1000, dimensions(n, seed), seed + 1))
+    upload = upload[["user_id", "product_id", "complaint_text", "complaint_priority"]].astype(str)
+    step("bulk.import_1000", lambda: import_batch("complaints", validate_batch("complaints", upload)[0]), rows=1000)
+
+    # ----- Chatbot -----
+    queries = CHATBOT_QUERIES * 25
+    step("chatbot.response", lambda: [chatbot_response(q) for q in queries], rows=len(queries))
+
+    results.put({"scale": n, "backend": backend, "sizes": sizes, "steps": steps})
+
+
+def compare(report, baseline, tolerance):
+    # A regression: same scale and step, slower than baseline * (1 + tolerance)
+    before = {(run["scale"], s["step"]): s["seconds"] for run in baseline["runs"] for s in run["steps"]}
+    regressions = []
+    for run in report["runs"]:
+        for s in run["steps"]:
+            old = before.get((run["scale"], s["step"]))
+            if old is not None and s["seconds"] > old * (1 + tolerance) and s["seconds"] - old > MIN_REGRESSION_SECONDS:
+                regressions.append({"scale": run["scale"], "step": s["step"], "baseline": old, "seconds": s["seconds"]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless end-to-end benchmark of the app's data paths")
+    parser.add_argument("--scales", default="1000,10000,100000", help="comma-separated complaint counts")
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "excel"])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="bench_report.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, 0.5 = 50%%")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for n in (int(float(s)) for s in args.scales.split(",")):
+        results = ctx.Queue()
+        proc = ctx.Process(target=run_scale, args=(n, args.backend, args.seed, results))
+        proc.start()
+        run = results.get()
+        proc.join()
+        runs.append(run)
+        print(f"\n{args.backend}, {n:,} complaints")
+        for s in run["steps"]:
+            rate = f"{s['rows_per_sec']:>12,} rows/sec" if s.get("rows_per_sec") else ""
+            print(f"  {s['step']:<32} {s['seconds'] * 1000:>11.2f} ms  {rate}")
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "runs": runs,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['scale']:,} {r['step']}: {r['baseline'] * 1000:.2f} ms -> {r['seconds'] * 1000:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# bench/sentiment_throughput.py
+# Sentiment scoring throughput (texts/sec) on a synthetic review corpus, against a scratch database.
+#
+#   python bench/sentiment_throughput.py [n_reviews] [workers]
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+OPENERS = ["This", "The", "My", "Our", "That"]
+SUBJECTS = ["chocolate", "milk", "snack packet", "juice", "soap", "biscuit pack", "masala", "ghee"]
+VERDICTS = ["was absolutely delicious", "tasted stale", "was okay for the price", "arrived damaged",
+            "is great value", "smelled awful", "was fresh and tasty", "was a bit too sweet"]
+CLOSERS = ["Highly recommended!", "Very disappointed.", "Would buy again.", "Not worth it.",
+           "Delivery was slow.", "Packaging was neat.", ""]
+
+
+def synthetic_reviews(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(OPENERS)} {rng.choice(SUBJECTS)} {rng.choice(VERDICTS)}. {rng.choice(CLOSERS)} #{i}"
+        for i in range(n)
+    ]
+
+
+def timed(label, n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {n:>8} texts  {elapsed:8.2f}s  {n / elapsed:>10.0f} texts/sec")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    os.environ["FEEDBACK_DB"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    import sentiment
+
+    corpus = synthetic_reviews(n)
+    sample = corpus[: min(n, 5_000)]
+    timed("baseline: TextBlob one by one", len(sample), lambda: [sentiment.polarity(t) for t in sample])
+    timed(f"pipeline cold ({workers} workers)", n, lambda: sentiment.score_texts(corpus, workers=workers))
+    timed("pipeline warm (in-memory cache)", n, lambda: sentiment.score_texts(corpus, workers=workers))
+    sentiment._memo.clear()
+    timed("pipeline warm (database cache)", n, lambda: sentiment.score_texts(corpus, workers=workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench/snapshot_startup.py
+# Cold-load time of a complaints workbook: pd.read_excel vs the memory-mapped Arrow snapshot.
+# Workbooks are synthetic and written to a scratch directory.
+#
+#   python bench/snapshot_startup.py [n_rows ...]     (default: 1000 100000 1000000)
+#
+# One run. The snapshot column is the memory-mapped read; pages are faulted in later, as columns are used.
+#        rows   xlsx MB  arrow MB  read_excel   snapshot   speedup
+#      100000       4.6      14.1      21.80s     0.003s     6812x
+#     1000000      46.1     141.7     346.65s     0.007s    49176x
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshots import read_snapshot, snapshot_path, write_snapshot  # noqa: E402
+
+STATUSES = ["Pending", "In Progress", "Resolved", "Rejected"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+
+
+def synthetic_complaints(n, seed=7):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "complaint_id": [f"C{i:07d}" for i in range(1, n + 1)],
+        "user_id": [f"U{rng.randrange(1, 5000):04d}" for _ in range(n)],
+        "product_id": [f"P{rng.randrange(1, 500):03d}" for _ in range(n)],
+        "vendor_id": [f"V{rng.randrange(1, 50):02d}" for _ in range(n)],
+        "complaint_text": [f"Complaint number {i} about a damaged pack" for i in range(n)],
+        "complaint_date": pd.Timestamp("2024-01-01") + pd.to_timedelta([rng.randrange(365) for _ in range(n)], "D"),
+        "complaint_status": [rng.choice(STATUSES) for _ in range(n)],
+        "complaint_priority": [rng.choice(PRIORITIES) for _ in range(n)],
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    scratch = tempfile.mkdtemp()
+    print(f"{'rows':>9}  {'xlsx MB':>8}  {'arrow MB':>8}  {'read_excel':>10}  {'snapshot':>9}  {'speedup':>8}")
+    for n in sizes:
+        path = os.path.join(scratch, f"complaints_{n}.xlsx")
+        df = synthetic_complaints(n)
+        df.to_excel(path, index=False, engine="openpyxl")
+        write_snapshot(path, df)
+
+        from_excel, excel_time = timed(lambda: pd.read_excel(path))
+        from_snapshot, snapshot_time = timed(lambda: read_snapshot(path))
+        assert from_snapshot is not None and len(from_snapshot) == len(from_excel) == n
+        assert list(from_snapshot.columns) == list(from_excel.columns)
+
+        print(f"{n:>9}  {os.path.getsize(path) / 1e6:>8.1f}  {os.path.getsize(snapshot_path(path)) / 1e6:>8.1f}  "
+              f"{excel_time:>9.2f}s  {snapshot_time:>8.3f}s  {excel_time / snapshot_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench/stress_ids.py
+# Hammer ID allocation + inserts from several processes x threads against a scratch database
+# and check that every complaint id is unique and no row was lost.
+#
+#   python bench/stress_ids.py [processes] [threads] [rows_per_thread]
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def submit_rows(args):
+    worker, threads, rows = args
+    import storage
+
+    def run(thread):
+        ids = []
+        for i in range(rows):
+            new_id = storage.allocate_id("complaints")
+            storage.insert_record("complaints", {
+                "complaint_id": new_id,
+                "user_id": "U001",
+                "complaint_text": f"stress {worker}-{thread}-{i}",
+                "complaint_status": "Pending",
+            })
+            ids.append(new_id)
+        storage.close_connection()
+        return ids
+
+    with ThreadPoolExecutor(threads) as pool:
+        return [i for ids in pool.map(run, range(threads)) for i in ids]
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:4]]
+    processes, threads, rows = args + [4, 8, 100][len(args):]
+    os.environ["FEEDBACK_DB"] = os.path.join(tempfile.mkdtemp(), "stress.db")
+    import storage
+    before = len(storage.load_table("complaints"))
+
+    start = time.perf_counter()
+    with Pool(processes) as pool:
+        allocated = [i for ids in pool.map(submit_rows, [(w, threads, rows) for w in range(processes)]) for i in ids]
+    elapsed = time.perf_counter() - start
+
+    stored = storage.load_table("complaints")["complaint_id"]
+    expected = processes * threads * rows
+    duplicates = len(allocated) - len(set(allocated))
+    print(f"submitted {expected} rows in {elapsed:.2f}s ({expected / elapsed:.0f} rows/sec)")
+    print(f"duplicate ids handed out: {duplicates}")
+    print(f"rows stored: {len(stored) - before} (expected {expected}), unique in table: {stored.is_unique}")
+    if duplicates or len(stored) - before != expected or not stored.is_unique:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# bench/stress_shared_state.py
+# Several worker processes, each standing in for a Streamlit server process, submit complaints
+# and change their statuses concurrently against a scratch copy of Data/. Afterwards every
+# update must be in storage (no lost updates) and every worker, refreshed only through
+# sync_changes, must see all rows in both its table cache and its KPI store, with the same
+# status counts as a KPI store rebuilt from scratch.
+#
+#   python bench/stress_shared_state.py [workers] [rows_per_worker] [sqlite|excel]
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STATUSES = ["Open", "In Progress", "Pending", "Resolved", "Closed"]
+UPDATES_PER_ROW = 2
+
+
+def worker(n, rows, barrier, results):
+    import storage
+    from aggregates import KpiStore, get_kpi_store
+
+    rng = random.Random(n)
+    final = {}
+    start = time.perf_counter()
+    for i in range(rows):
+        # What app.py does at the top of every rerun
+        storage.sync_changes()
+        get_kpi_store()
+        complaint_id = storage.allocate_id("complaints")
+        storage.insert_record("complaints", {
+            "complaint_id": complaint_id,
+            "user_id": "U001",
+            "vendor_id": f"V{n:03d}",
+            "complaint_text": f"stress {n}-{i}",
+            "complaint_status": "Open",
+            "complaint_priority": "Low",
+        })
+        final[complaint_id] = "Open"
+        for _ in range(UPDATES_PER_ROW):
+            target = rng.choice(list(final))
+            final[target] = rng.choice(STATUSES)
+            storage.update_record("complaints", target, {"complaint_status": final[target]})
+    elapsed = time.perf_counter() - start
+
+    barrier.wait()
+    storage.sync_changes()
+    seen_rows = len(storage.load_data("complaints"))
+    store = get_kpi_store()
+    # The store was kept current by replayed changes; it must agree with one built from scratch
+    rebuilt = KpiStore()
+    if any(store.complaints_with_status(s) != rebuilt.complaints_with_status(s) for s in STATUSES):
+        seen_kpi = None
+    else:
+        seen_kpi = store.total_complaints()
+    results.put((n, final, seen_rows, seen_kpi, elapsed))
+
+
+def main():
+    args = sys.argv[1:]
+    workers = int(args[0]) if len(args) > 0 else 4
+    rows = int(args[1]) if len(args) > 1 else 100
+    backend = args[2] if len(args) > 2 else "sqlite"
+
+    scratch = tempfile.mkdtemp()
+    shutil.copytree(os.path.join(ROOT, "Data"), os.path.join(scratch, "Data"),
+                    ignore=shutil.ignore_patterns("*.db*", "pending_writes.jsonl*", "*.arrow"))
+    os.chdir(scratch)
+    os.environ["FEEDBACK_DB"] = os.path.join(scratch, "Data", "stress.db")
+    os.environ["FEEDBACK_BACKEND"] = backend
+    os.environ["FEEDBACK_COMPACT_INTERVAL"] = "1"
+    import storage
+    before = len(storage.load_data("complaints"))
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(n, rows, barrier, results)) for n in range(workers)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    expected = before + workers * rows
+    writes = workers * rows * (1 + UPDATES_PER_ROW)
+    lost = sum(
+        (storage.get_record("complaints", cid) or {}).get("complaint_status") != status
+        for _, final, *_ in reports for cid, status in final.items()
+    )
+    stored = storage.load_data("complaints")
+    stale = [(n, seen_rows, seen_kpi) for n, _, seen_rows, seen_kpi, _ in sorted(reports)
+             if seen_rows != expected or seen_kpi != expected]
+    print(f"{backend}: {workers} workers, {writes} writes in {elapsed:.2f}s ({writes / elapsed:.0f} writes/sec)")
+    print(f"rows stored: {len(stored)} (expected {expected}), unique ids: {stored['complaint_id'].is_unique}")
+    print(f"lost status updates: {lost}")
+    print(f"workers with a stale view after sync_changes: {len(stale)} {stale or ''}")
+    if lost or stale or len(stored) != expected or not stored["complaint_id"].is_unique:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# bench/synthetic.py
+# Synthetic users/vendors/products/complaints/reviews at any scale, with the schemas of
+# storage.TABLES and value distributions modelled on Data/*.xlsx. The dimension tables grow with
+# the number of complaints, and popularity is skewed: a few vendors and products draw most of
+# the feedback, as in the real data. Everything is vectorized and the fact tables are produced
+# in chunks, so 10^7 complaints fit in memory.
+#
+#   python bench/synthetic.py n_complaints [out_dir]   -> write the five workbooks (keep n small)
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATES = ["Delhi", "Maharashtra", "Karnataka", "Tamil Nadu", "West Bengal", "Gujarat", "Rajasthan",
+          "Uttar Pradesh", "Punjab", "Kerala", "Telangana", "Goa", "Bihar", "Madhya Pradesh"]
+FIRST_NAMES = ["Aditi", "Raj", "Priya", "Rohan", "Sonal", "Saurabh", "Neha", "Amit", "Kavya", "Arjun",
+               "Pooja", "Vikram", "Ananya", "Rahul", "Sneha", "Karan", "Meera", "Ishaan", "Divya", "Nikhil"]
+LAST_NAMES = ["Singh", "Kumar", "Sharma", "Das", "Patel", "Gupta", "Reddy", "Iyer", "Nair", "Mehta",
+              "Joshi", "Verma", "Rao", "Chopra", "Bose"]
+BRANDS = ["Magz", "Gokul", "Aditya", "Bikanervala", "Haldiram", "Amul", "Tata", "Catch", "Saffola",
+          "Bru", "Patanjali", "Britannia", "Parle", "Dabur", "MTR", "Everest"]
+VENDOR_SUFFIXES = ["Foods", "Dairy", "Naturals", "Traders", "Sweets", "Spices", "Beverages", "Mart"]
+CATEGORIES = {
+    "Snacks": ["Namkeen", "Chips", "Bhujia", "Mixture"],
+    "Spices": ["Chaat Masala", "Garam Masala", "Turmeric", "Chilli Powder"],
+    "Tea": ["Masala Tea", "Green Tea", "Assam Tea"],
+    "Dairy": ["Ghee", "Paneer", "Butter", "Milk"],
+    "Chocolate": ["Dark Chocolate", "Milk Chocolate"],
+    "Health": ["Chyawanprash", "Honey", "Oats"],
+    "Coffee": ["Filter Coffee", "Instant Coffee"],
+    "Rice": ["Basmati Rice", "Sona Masoori"],
+    "Sweet": ["Gulab Mithai", "Rasgulla", "Soan Papdi"],
+    "Beverage": ["Mango Drink", "Lassi"],
+    "Oil": ["Active Oil", "Mustard Oil"],
+    "Condiments": ["Tomato Ketchup", "Mango Pickle"],
+}
+COMPLAINT_TEXTS = [
+    "The snack packet was delivered torn and the contents were stale.",
+    "The product I received is expired. This is a serious health risk.",
+    "Found a foreign particle inside the pack. Very unhygienic.",
+    "The seal was broken when it arrived and the quantity was short.",
+    "It tastes completely different from the last batch I bought.",
+    "Packaging was leaking and the box was soaked.",
+    "The label has no manufacturing date printed on it.",
+    "Charged more than the MRP printed on the pack.",
+]
+REVIEW_TEXTS = {
+    1: ["Terrible quality, will never buy again.", "Stale and smelled awful."],
+    2: ["The product was stale and the packaging looked old.", "Not worth the price."],
+    3: ["It was okay, nothing special.", "Average taste, decent packaging."],
+    4: ["Good taste and fresh, would buy again.", "Nice product, delivery was quick."],
+    5: ["Absolutely delicious! Highly recommended!", "Rich flavour and perfectly fresh."],
+}
+REVIEW_TEXT_TABLE = np.array([REVIEW_TEXTS[r] for r in sorted(REVIEW_TEXTS)], dtype=object)
+STATUS_WEIGHTS = {"In Progress": 0.35, "Open": 0.31, "Closed": 0.27, "Pending": 0.04, "Resolved": 0.03}
+PRIORITY_WEIGHTS = {"Medium": 0.34, "Low": 0.28, "High": 0.26, "Urgent": 0.12}
+RATING_WEIGHTS = {1: 0.08, 2: 0.12, 3: 0.18, 4: 0.30, 5: 0.32}
+DATE_RANGE = (pd.Timestamp("2023-01-01"), pd.Timestamp("2024-12-31"))
+CHUNK_SIZE = 100_000
+
+
+def scale_sizes(n_complaints):
+    # Same proportions as the shipped workbooks (404 users, 100 vendors, 200 products,
+    # 156 complaints, 51 reviews), with the dimension tables growing more slowly than the facts
+    return {
+        "users": max(n_complaints // 5, 400),
+        "vendors": max(n_complaints // 1000, 100),
+        "products": max(n_complaints // 250, 200),
+        "complaints": n_complaints,
+        "reviews": n_complaints // 3,
+    }
+
+
+def _ids(prefix, start, count):
+    # Same format as storage._next_ids
+    return prefix + pd.Series(np.arange(start, start + count)).astype(str).str.zfill(3)
+
+
+def _pick(rng, options, size, weights=None):
+    options = np.asarray(list(options), dtype=object)
+    p = None if weights is None else np.asarray(list(weights), dtype=float) / sum(weights)
+    return options[rng.choice(len(options), size=size, p=p)]
+
+
+def _popularity(rng, n, skew=1.1):
+    # Zipf-like weights over n items, shuffled so popular items are spread over the id range
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.permutation(weights / weights.sum())
+
+
+def dimensions(n_complaints, seed=7):
+    rng = np.random.default_rng(seed)
+    sizes = scale_sizes(n_complaints)
+    users = pd.DataFrame({
+        "user_id": _ids("U", 1, sizes["users"]),
+        "name": _pick(rng, FIRST_NAMES, sizes["users"]) + " " + _pick(rng, LAST_NAMES, sizes["users"]),
+        "state": _pick(rng, STATES, sizes["users"]),
+    })
+    n = sizes["vendors"]
+    vendors = pd.DataFrame({
+        "vendor_id": _ids("V", 1, n),
+        "vendor_name": _pick(rng, BRANDS, n) + " " + _pick(rng, VENDOR_SUFFIXES, n) + " " + pd.Series(np.arange(1, n + 1)).astype(str),
+        "state": _pick(rng, STATES, n),
+        "fssai_code": rng.integers(10**9, 10**10, n),
+    })
+    n = sizes["products"]
+    categories = _pick(rng, CATEGORIES, n)
+    vendor_pos = rng.choice(len(vendors), size=n, p=_popularity(rng, len(vendors)))
+    products = pd.DataFrame({
+        "product_id": _ids("P", 1, n),
+        "product_name": _pick(rng, BRANDS, n) + " " + pd.Series([rng.choice(CATEGORIES[c]) for c in categories])
+        + " " + pd.Series(np.arange(1, n + 1)).astype(str),
+        "category": categories,
+        "vendor_id": vendors["vendor_id"].to_numpy()[vendor_pos],
+        "fssai_code": vendors["fssai_code"].to_numpy()[vendor_pos],
+        "is_verified": rng.random(n) < 0.9,
+    })
+    return {"users": users, "vendors": vendors, "products": products}
+
+
+def _dates(rng, size):
+    start, end = DATE_RANGE
+    seconds = rng.integers(0, int((end - start).total_seconds()), size)
+    return start + pd.to_timedelta(seconds, unit="s")
+
+
+def fact_chunks(table, count, dims, seed=7, chunk_size=CHUNK_SIZE):
+    # Yields DataFrames of at most chunk_size rows of complaints or reviews
+    rng = np.random.default_rng(seed + (1 if table == "complaints" else 2))
+    products = dims["products"]
+    product_p = _popularity(rng, len(products))
+    user_ids = dims["users"]["user_id"].to_numpy()
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        pos = rng.choice(len(products), size=size, p=product_p)
+        common = {
+            "user_id": user_ids[rng.integers(0, len(user_ids), size)],
+            "product_id": products["product_id"].to_numpy()[pos],
+            "vendor_id": products["vendor_id"].to_numpy()[pos],
+        }
+        if table == "complaints":
+            yield pd.DataFrame({
+                "complaint_id": _ids("C", start + 1, size),
+                **common,
+                "fssai_code": products["fssai_code"].to_numpy()[pos],
+                # Lot numbers give the text a long tail of rare terms, as real complaints have
+                "complaint_text": _pick(rng, COMPLAINT_TEXTS, size) + " Lot L"
+                + pd.Series(rng.integers(0, 100_000, size)).astype(str).str.zfill(5).to_numpy(dtype=object),
+                "complaint_status": _pick(rng, STATUS_WEIGHTS, size, STATUS_WEIGHTS.values()),
+                "complaint_priority": _pick(rng, PRIORITY_WEIGHTS, size, PRIORITY_WEIGHTS.values()),
+                "complaint_date": _dates(rng, size),
+                "complaint_image_url": "",
+                "complaint_sentiment": "Negative",
+            })
+        else:
+            ratings = _pick(rng, RATING_WEIGHTS, size, RATING_WEIGHTS.values()).astype(int)
+            texts = REVIEW_TEXT_TABLE[ratings - 1, rng.integers(0, REVIEW_TEXT_TABLE.shape[1], size)]
+            yield pd.DataFrame({
+                "review_id": _ids("R", start + 1, size),
+                **common,
+                "rating": ratings,
+                "review_text": texts,
+                "review_date": _dates(rng, size),
+                "review_sentiment": np.where(ratings >= 4, "Positive", np.where(ratings <= 2, "Negative", "Neutral")),
+            })
+
+
+def populate(n_complaints, seed=7, chunk_size=CHUNK_SIZE):
+    # Fills the current app database (FEEDBACK_DB) through storage, replacing whatever was there
+    import storage
+
+    dims = dimensions(n_complaints, seed)
+    for table, df in dims.items():
+        storage.save_data(df, table)
+    sizes = scale_sizes(n_complaints)
+    for table in ("complaints", "reviews"):
+        storage.save_data(pd.DataFrame(columns=list(storage.TABLES[table]["columns"])), table)
+        for chunk in fact_chunks(table, sizes[table], dims, seed, chunk_size):
+            storage.insert_rows(table, chunk.to_dict("records"))
+    storage.table_cache.invalidate()
+    return sizes
+
+
+def write_workbooks(n_complaints, out_dir, seed=7):
+    # The excel backend's layout: one workbook per table, named as in storage.TABLES
+    from storage import TABLES
+
+    dims = dimensions(n_complaints, seed)
+    sizes = scale_sizes(n_complaints)
+    frames = dict(dims)
+    for table in ("complaints", "reviews"):
+        frames[table] = pd.concat(list(fact_chunks(table, sizes[table], dims, seed)), ignore_index=True)
+    os.makedirs(out_dir, exist_ok=True)
+    for table, df in frames.items():
+        df.to_excel(os.path.join(out_dir, os.path.basename(TABLES[table]["file"])), index=False)
+    return sizes
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python bench/synthetic.py n_complaints [out_dir]")
+        sys.exit(1)
+    out = sys.argv[2] if len(sys.argv) > 2 else "synthetic_data"
+    for table, n in write_workbooks(int(sys.argv[1]), out).items():
+        print(f"{table}: {n} rows")
+    print(f"Wrote workbooks to {out}")
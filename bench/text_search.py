@@ -0,0 +1,79 @@
+# bench/text_search.py
+# Full-text search latency over synthetic complaints (bench/synthetic.py): the FTS5 index with
+# bm25 ranking next to a .str.contains scan of the cached table, for rare and common terms,
+# phrases, prefixes and filtered queries; plus what the index adds to inserts.
+#
+#   python bench/text_search.py [n_complaints]   (default 1000000)
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REPEAT = 5
+
+
+def best_of(fn, repeat=REPEAT):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    n = int(float(sys.argv[1])) if len(sys.argv) > 1 else 1_000_000
+    scratch = tempfile.mkdtemp()
+    os.chdir(scratch)
+    os.makedirs("Data")
+    os.environ["FEEDBACK_DB"] = os.path.join(scratch, "Data", "bench.db")
+    os.environ["FEEDBACK_BACKEND"] = "sqlite"
+    import storage
+    from synthetic import populate
+
+    start = time.perf_counter()
+    sizes = populate(n)
+    print(f"populate {sizes['complaints']:,} complaints + {sizes['reviews']:,} reviews, indexed as they are "
+          f"inserted: {time.perf_counter() - start:.1f}s")
+    _, rebuild = best_of(storage.rebuild_text_indexes, repeat=1)
+    print(f"rebuild both text indexes from scratch: {rebuild:.1f}s\n")
+
+    complaints = storage.load_data("complaints")
+    lot = complaints["complaint_text"].iloc[n // 2].rsplit(" ", 1)[-1]
+    vendor_id = complaints["vendor_id"].value_counts().index[0]
+    texts = complaints["complaint_text"].astype(str).str.casefold()
+    queries = [
+        ("rare term", lot, {}, lambda: texts.str.contains(lot.casefold(), regex=False)),
+        ("common term", "expired", {}, lambda: texts.str.contains("expired", regex=False)),
+        ("two terms", "foreign particle", {},
+         lambda: texts.str.contains("foreign", regex=False) & texts.str.contains("particle", regex=False)),
+        ("phrase", '"seal was broken"', {}, lambda: texts.str.contains("seal was broken", regex=False)),
+        ("prefix", "unhyg*", {}, lambda: texts.str.contains("unhyg", regex=False)),
+        ("term + vendor + status", "expired", {"vendor_id": vendor_id, "statuses": ["Open"]},
+         lambda: texts.str.contains("expired", regex=False) & (complaints["vendor_id"] == vendor_id)
+         & (complaints["complaint_status"] == "Open")),
+    ]
+    print(f"{'query':<24} {'fts5 top 50':>12} {'scan':>10}  matches")
+    for label, text, filters, scan in queries:
+        hits, fts_time = best_of(lambda: storage.search_text("complaints", text, limit=50, **filters))
+        mask, scan_time = best_of(scan, repeat=1)
+        assert len(hits) == min(50, int(mask.sum())), label
+        print(f"{label:<24} {fts_time * 1000:>9.1f} ms {scan_time * 1000:>7.0f} ms  {int(mask.sum()):,}")
+
+    # A submission is searchable as soon as it commits
+    new_id = storage.allocate_id("complaints")
+    _, insert_time = best_of(lambda: storage.insert_record("complaints", {
+        "complaint_id": new_id, "complaint_text": "Weevils found in the rice packet", "complaint_status": "Open",
+    }), repeat=1)
+    found = storage.search_text("complaints", "weevils")["complaint_id"].tolist()
+    assert found == [new_id], found
+    print(f"\ninsert_record, indexed in the same transaction: {insert_time * 1000:.1f} ms, searchable at once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# bulk.py
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from storage import (
+    COMPLAINT_PRIORITIES, COMPLAINT_STATUSES, TABLES,
+    allocate_ids, insert_records, load_data, update_matching, update_records,
+)
+
+
+# ---------- Upload Format ----------
+# One row per complaint/review. The product can be given by product_id or product_name; vendor
+# and FSSAI code always come from the product, as on the submit pages. Optional columns fall
+# back to the defaults below, and a missing date means "now".
+BULK_TABLES = {
+    "complaints": {
+        "required": ["user_id", "complaint_text"],
+        "defaults": {"complaint_status": "Pending", "complaint_priority": "Low", "complaint_image_url": ""},
+        "text": "complaint_text",
+        "date": "complaint_date",
+    },
+    "reviews": {
+        "required": ["user_id", "rating", "review_text"],
+        "defaults": {},
+        "text": "review_text",
+        "date": "review_date",
+    },
+}
+
+
+def read_upload(file, name=None):
+    # file: a path or an uploaded file object; every cell is read as text and validated later
+    name = name or getattr(file, "name", file)
+    if os.path.splitext(str(name))[1].lower() in (".xlsx", ".xls"):
+        return pd.read_excel(file, dtype=str)
+    return pd.read_csv(file, dtype=str, keep_default_na=False)
+
+
+# ---------- Validation ----------
+def _cells(df, col):
+    if col not in df.columns:
+        return pd.Series("", index=df.index)
+    return df[col].fillna("").astype(str).str.strip()
+
+
+def _labels(series, allowed):
+    # Case-insensitive match onto the canonical labels; unknown labels become NaN
+    canonical = {label.casefold(): label for label in allowed}
+    return series.str.strip().str.casefold().map(canonical)
+
+
+def validate_batch(table, df):
+    # Checks a whole upload with column operations. Returns (rows ready for insert_records minus
+    # their ids, errors DataFrame with the file row number and a message per problem).
+    spec = BULK_TABLES[table]
+    df = df.rename(columns=lambda c: str(c).strip().lower()).reset_index(drop=True)
+    missing = [c for c in spec["required"] if c not in df.columns]
+    if "product_id" not in df.columns and "product_name" not in df.columns:
+        missing.append("product_id or product_name")
+    if missing:
+        raise ValueError(f"Upload is missing column(s): {', '.join(missing)}")
+
+    # Rows that give no product_id are looked up by product_name
+    products = load_data("products").set_index("product_id")
+    by_name = pd.Series(products.index, index=products["product_name"].str.casefold())
+    by_name = by_name[~by_name.index.duplicated()]
+    product_id = _cells(df, "product_id").str.upper()
+    product_id = product_id.mask(product_id == "", _cells(df, "product_name").str.casefold().map(by_name))
+    user_id = _cells(df, "user_id").str.upper()
+
+    out = pd.DataFrame({
+        "user_id": user_id,
+        "product_id": product_id,
+        "vendor_id": product_id.map(products["vendor_id"].astype(object)),
+        spec["text"]: _cells(df, spec["text"]),
+    })
+    if table == "complaints":
+        out["fssai_code"] = product_id.map(products["fssai_code"].astype(object))
+    checks = [
+        (~user_id.isin(load_data("users")["user_id"]), "unknown user_id"),
+        (~product_id.isin(products.index), "unknown product"),
+        (out[spec["text"]] == "", f"{spec['text']} is empty"),
+    ]
+
+    given_date = _cells(df, spec["date"])
+    dates = pd.to_datetime(given_date.mask(given_date == ""), errors="coerce")
+    checks.append((given_date.ne("") & dates.isna(), f"{spec['date']} is not a date"))
+    out[spec["date"]] = dates.fillna(pd.Timestamp(datetime.now()))
+
+    for col, default in spec["defaults"].items():
+        given = _cells(df, col)
+        out[col] = given.mask(given == "", default)
+    if table == "complaints":
+        for col, allowed in (("complaint_status", COMPLAINT_STATUSES), ("complaint_priority", COMPLAINT_PRIORITIES)):
+            labels = _labels(out[col], allowed)
+            checks.append((labels.isna(), f"{col} must be one of {', '.join(allowed)}"))
+            out[col] = labels
+        out["complaint_sentiment"] = None
+    else:
+        rating = pd.to_numeric(_cells(df, "rating"), errors="coerce")
+        checks.append((~rating.between(1, 5) | (rating % 1 != 0), "rating must be a whole number from 1 to 5"))
+        out["rating"] = rating
+        out["review_sentiment"] = None
+
+    bad = np.zeros(len(df), dtype=bool)
+    errors = []
+    for mask, message in checks:
+        mask = mask.to_numpy(dtype=bool)
+        bad |= mask
+        errors.append(pd.DataFrame({"row": np.flatnonzero(mask) + 2, "error": message}))  # +2: header line, 1-based
+    errors = pd.concat(errors, ignore_index=True).sort_values("row", kind="stable").reset_index(drop=True)
+    columns = [c for c in TABLES[table]["columns"] if c in out.columns]
+    return out.loc[~bad, columns].reset_index(drop=True), errors
+
+
+# ---------- Bulk Writes ----------
+def import_batch(table, rows):
+    # rows: the first value of validate_batch. Ids are allocated as one block and the whole
+    # batch is committed in a single write. Returns the new ids.
+    if rows.empty:
+        return []
+    rows = rows.copy()
+    key = TABLES[table]["key"]
+    rows.insert(0, key, allocate_ids(table, len(rows)))
+    if "rating" in rows.columns:
+        rows["rating"] = rows["rating"].astype(int)
+    insert_records(table, rows.to_dict("records"))
+    return rows[key].tolist()
+
+
+def _check_status(status):
+    if status not in COMPLAINT_STATUSES:
+        raise ValueError(f"Unknown complaint status {status!r}")
+
+
+def set_complaint_status(complaint_ids, status):
+    # Returns the number of complaints updated; unknown ids are not counted
+    _check_status(status)
+    return update_records("complaints", {cid: {"complaint_status": status} for cid in complaint_ids})
+
+
+def set_matching_complaint_status(status, **filters):
+    # Every complaint matching the Track Complaints filters (see storage.query_complaints), in
+    # a single UPDATE. Returns the number of complaints updated.
+    _check_status(status)
+    return update_matching("complaints", {"complaint_status": status}, **filters)
@@ -0,0 +1,57 @@
+# cache.py
+import threading
+import time
+from collections import Counter
+
+
+# ---------- Table Cache ----------
+# Lives in an imported module so it survives Streamlit reruns (only app.py is re-executed).
+class TableCache:
+    def __init__(self, loader, signature):
+        # loader(table) -> DataFrame, signature(table) -> hashable version stamp of the table
+        self._loader = loader
+        self._signature = signature
+        self._entries = {}
+        self._lock = threading.RLock()
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = Counter()
+        self.load_seconds = Counter()
+
+    def get(self, table):
+        sig = self._signature(table)
+        with self._lock:
+            entry = self._entries.get(table)
+            if entry is not None and entry[0] == sig:
+                self.hits[table] += 1
+                return entry[1]
+            self.misses[table] += 1
+            start = time.perf_counter()
+            df = self._loader(table)
+            self.load_seconds[table] += time.perf_counter() - start
+            self._entries[table] = (sig, df)
+            return df
+
+    def invalidate(self, table=None):
+        with self._lock:
+            tables = list(self._entries) if table is None else [table]
+            for name in tables:
+                if self._entries.pop(name, None) is not None:
+                    self.evictions[name] += 1
+
+    def after_write(self, table):
+        # Signatures are per table, so a write only ever invalidates the table it wrote
+        self.invalidate(table)
+
+    def stats(self):
+        with self._lock:
+            return {
+                table: {
+                    "cached": table in self._entries,
+                    "hits": self.hits[table],
+                    "misses": self.misses[table],
+                    "evictions": self.evictions[table],
+                    "load_seconds": round(self.load_seconds[table], 4),
+                }
+                for table in sorted(set(self.hits) | set(self.misses) | set(self._entries))
+            }
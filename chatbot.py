@@ -0,0 +1,162 @@
+# chatbot.py
+import csv
+import json
+import os
+import re
+import threading
+
+from storage import DATA_DIR
+
+
+# ---------- Chatbot FAQs ----------
+faq = {
+    # English
+    "en": {
+        "hello": "Hello! How can I help you today?",
+        "hi": "Hi there! How can I assist you?",
+        "help": "You can submit complaints, reviews, track complaints, view analytics, or get vendor info.",
+        "submit complaint": "Go to 'Submit Complaint' page to lodge a new complaint.",
+        "submit review": "Go to 'Submit Review' page to add a product review.",
+        "track complaints": "Go to 'Track Complaints' page to see complaint status.",
+        "vendor dashboard": "Go to 'Vendor Dashboard' page to see vendor stats.",
+        "analytics": "Go to 'Analytics' page to view KPIs and charts.",
+        "quick stats": "Total complaints, resolved complaints, pending complaints, avg. ratings, total users, total vendors.",
+        "thank you": "You're welcome!",
+        "bye": "Goodbye! Have a great day!"
+    },
+
+    # Hindi
+    "hi": {
+        "hello": "नमस्ते! मैं आपकी कैसे मदद कर सकता हूँ?",
+        "hi": "हाय! मैं आपकी कैसे सहायता करूँ?",
+        "help": "आप शिकायत दर्ज कर सकते हैं, समीक्षा जोड़ सकते हैं, शिकायतें ट्रैक कर सकते हैं, एनालिटिक्स देख सकते हैं, या विक्रेता जानकारी प्राप्त कर सकते हैं।",
+        "submit complaint": "नया शिकायत दर्ज करने के लिए 'Submit Complaint' पेज पर जाएँ।",
+        "submit review": "उत्पाद समीक्षा जोड़ने के लिए 'Submit Review' पेज पर जाएँ।",
+        "track complaints": "'Track Complaints' पेज पर जाकर शिकायत स्थिति देखें।",
+        "vendor dashboard": "'Vendor Dashboard' पेज पर जाकर विक्रेता आँकड़े देखें।",
+        "analytics": "KPIs और चार्ट देखने के लिए 'Analytics' पेज पर जाएँ।",
+        "quick stats": "कुल शिकायतें, हल की गई शिकायतें, लंबित शिकायतें, औसत रेटिंग, कुल उपयोगकर्ता, कुल विक्रेता।",
+        "thank you": "आपका स्वागत है!",
+        "bye": "अलविदा! आपका दिन शुभ हो!"
+    }
+}
+
+FALLBACK = {
+    "en": "Sorry, I didn't understand that. Please try again.",
+    "hi": "माफ़ कीजिये, मैं इसे समझ नहीं पाया। कृपया पुनः प्रयास करें।",
+}
+
+# Optional extra FAQ entries, merged over the built-in ones (JSON {lang: {key: answer}}
+# or CSV with lang,key,answer columns)
+FAQ_FILE = os.environ.get("FEEDBACK_FAQ", os.path.join(DATA_DIR, "faq.json"))
+
+
+def load_faq(path):
+    entries = {}
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                entries.setdefault(row["lang"], {})[row["key"]] = row["answer"]
+    else:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+    return entries
+
+
+if os.path.exists(FAQ_FILE):
+    for _lang, _entries in load_faq(FAQ_FILE).items():
+        faq.setdefault(_lang, {}).update(_entries)
+
+
+# ---------- Intent Matcher ----------
+# Token trie over the FAQ keys. A query walks the trie from each token, so its cost depends on
+# the query length and the longest key, not on the number of FAQ entries. Matching is on whole
+# words ("hi" no longer fires inside "this"), and the longest key wins, earlier keys on ties.
+_TOKEN = re.compile(r"[\w\u0900-\u097f]+")
+_END = object()
+
+
+def tokenize(text):
+    tokens = _TOKEN.findall(text.lower())
+    # Cheap plural folding so "complaint" and "complaints" meet
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t for t in tokens]
+
+
+def _deletions(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+class IntentMatcher:
+    def __init__(self, entries, fuzzy_min_length=4):
+        self.entries = dict(entries)
+        self.fuzzy_min_length = fuzzy_min_length
+        self._trie = {}
+        self._rank = {}
+        # deletion variant -> vocabulary tokens, for typo-tolerant lookups (edit distance ~1)
+        self._variants = {}
+        for rank, key in enumerate(self.entries):
+            tokens = tokenize(key)
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+                if len(token) >= fuzzy_min_length:
+                    for variant in _deletions(token) | {token}:
+                        self._variants.setdefault(variant, set()).add(token)
+            node.setdefault(_END, key)
+            self._rank[key] = (len(tokens), len(key), -rank)
+
+    def _fuzzy(self, token):
+        if len(token) < self.fuzzy_min_length:
+            return set()
+        found = set()
+        for variant in _deletions(token) | {token}:
+            found |= self._variants.get(variant, set())
+        return found
+
+    def match(self, text, fuzzy=False):
+        # fuzzy: only when no key matches exactly, retry with typos corrected against the vocabulary
+        # ("complant" -> "complaint"). It is slower and may pick a wrong key ("held" -> "help").
+        tokens = tokenize(text)
+        best = self._walk([[t] for t in tokens])
+        if best is None and fuzzy:
+            best = self._walk([[t] + sorted(self._fuzzy(t) - {t}) for t in tokens])
+        return best
+
+    def _walk(self, tokens):
+        best = None
+        for start in range(len(tokens)):
+            frontier = [self._trie]
+            for options in tokens[start:]:
+                frontier = [node[t] for node in frontier for t in options if t in node]
+                if not frontier:
+                    break
+                for node in frontier:
+                    key = node.get(_END)
+                    if key is not None and (best is None or self._rank[key] > self._rank[best]):
+                        best = key
+        return best
+
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_matcher(lang):
+    matcher = _matchers.get(lang)
+    if matcher is None:
+        with _matchers_lock:
+            matcher = _matchers.get(lang)
+            if matcher is None:
+                matcher = _matchers[lang] = IntentMatcher(faq[lang])
+    return matcher
+
+
+def chatbot_response(user_input, lang="en", fuzzy=False):
+    key = get_matcher(lang).match(user_input, fuzzy=fuzzy)
+    if key is not None:
+        return faq[lang][key]
+
+    # Default response if no match
+    return FALLBACK.get(lang, FALLBACK["en"])
@@ -0,0 +1,201 @@
+# export.py
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from indexes import get_dimension_index
+from metrics import instrument
+from schema import DATE_COLUMNS
+from storage import TABLES, last_export_version, read_snapshot, record_export, table_version
+from wal import file_lock, write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- Settings ----------
+EXPORT_TABLES = ["complaints", "reviews"]
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+CHUNK_ROWS = 50_000
+# Streamlit holds a download in memory while serving it, so the in-app button is for exports up to
+# this many rows; larger ones go through `python export.py full` or the incremental export
+UI_MAX_ROWS = int(os.environ.get("FEEDBACK_EXPORT_UI_MAX_ROWS", "200000"))
+# Optional in-app schedule for the incremental export (cron or Task Scheduler running
+# `python export.py changes` does the same); every server process may run it, the lock file
+# in the output directory makes sure each change is exported once.
+EXPORT_DIR = os.environ.get("FEEDBACK_EXPORT_DIR")
+EXPORT_INTERVAL = int(os.environ.get("FEEDBACK_EXPORT_INTERVAL", "900"))
+EXPORT_FORMAT = os.environ.get("FEEDBACK_EXPORT_FORMAT", "parquet")
+
+# id column -> (added name column, DimensionIndex mapping)
+NAME_COLUMNS = {
+    "user_id": ("user_name", "user_name"),
+    "product_id": ("product_name", "product_name"),
+    "vendor_id": ("vendor_name", "vendor_name"),
+}
+
+
+# ---------- Layout ----------
+def export_columns(table):
+    # The table's columns, each id followed by the name it stands for
+    columns = []
+    for col in TABLES[table]["columns"]:
+        columns.append(col)
+        if col in NAME_COLUMNS:
+            columns.append(NAME_COLUMNS[col][0])
+    return columns
+
+
+def arrow_schema(table):
+    # Fixed up front, so every chunk lands in the same Parquet schema even when one of them
+    # happens to hold only nulls in a column
+    fields = []
+    for col in export_columns(table):
+        sql_type = TABLES[table]["columns"].get(col, "TEXT")
+        if col in DATE_COLUMNS:
+            fields.append(pa.field(col, pa.timestamp("us")))
+        elif sql_type.startswith("INTEGER"):
+            fields.append(pa.field(col, pa.int64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def _with_names(table, chunk, dims):
+    chunk = chunk.copy()
+    for col in chunk.columns:
+        if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            chunk[col] = chunk[col].astype(object)
+    for col, (name_col, mapping) in NAME_COLUMNS.items():
+        if col in chunk.columns:
+            chunk[name_col] = chunk[col].map(getattr(dims, mapping))
+    return chunk.reindex(columns=export_columns(table))
+
+
+# ---------- Streaming Export ----------
+def _write_csv(f, table, chunks):
+    pd.DataFrame(columns=export_columns(table)).to_csv(f, index=False)
+    rows = 0
+    for chunk in chunks:
+        chunk.to_csv(f, header=False, index=False)
+        rows += len(chunk)
+    return rows
+
+
+def _write_parquet(f, table, chunks):
+    # One row group per chunk
+    schema = arrow_schema(table)
+    rows = 0
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False, safe=False))
+            rows += len(chunk)
+    return rows
+
+
+@instrument("export.table", target="table", rows=lambda result, *args, **kwargs: result[0])
+def export_table(f, table, fmt="csv", chunk_size=CHUNK_ROWS, **filters):
+    # Writes the matching rows of a complaints/reviews table, joined with user, product and
+    # vendor names, into the binary file f one chunk at a time, so memory stays around one chunk
+    # whatever the table size. filters: see storage.read_snapshot. Returns (rows, table version).
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    dims = get_dimension_index()
+    with read_snapshot(table, chunk_size, **filters) as (version, chunks):
+        named = (_with_names(table, chunk, dims) for chunk in chunks)
+        rows = (_write_parquet if fmt == "parquet" else _write_csv)(f, table, named)
+    return rows, version
+
+
+def download(table, fmt="csv", **filters):
+    # For st.download_button's deferred `data`: runs only when the button is clicked and returns
+    # the whole file as bytes, so the app offers it for at most UI_MAX_ROWS rows
+    def build():
+        f = io.BytesIO()
+        export_table(f, table, fmt, **filters)
+        return f.getvalue()
+
+    return build
+
+
+def file_name(table, fmt, suffix=""):
+    return f"{table}{suffix}_{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+
+
+# ---------- Incremental Export ----------
+@instrument("export.changes", target="table")
+def export_changes(table, out_dir, fmt=EXPORT_FORMAT, feed="scheduled"):
+    # Writes the rows inserted or updated since the feed's last run into a new file in out_dir
+    # and records the run. A feed's first run exports the whole table. Returns (path, rows), or
+    # (None, 0) when the table has not changed.
+    os.makedirs(out_dir, exist_ok=True)
+    with file_lock(os.path.join(out_dir, ".export.lock")):
+        since = last_export_version(feed, table)
+        if since is not None and since >= table_version(table):
+            return None, 0
+        path = os.path.join(out_dir, file_name(table, fmt, f"_{feed}"))
+        result = {}
+
+        def write(f):
+            result["rows"], result["version"] = export_table(f, table, fmt, since_version=since)
+
+        write_atomic(path, write)
+        record_export(feed, table, since, result["version"], result["rows"], path)
+    return path, result["rows"]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduled_export():
+    # With FEEDBACK_EXPORT_DIR set, the server exports each table's changes there every
+    # EXPORT_INTERVAL seconds itself, instead of a cron job running the CLI below
+    global _scheduler
+    if not EXPORT_DIR or _scheduler is not None:
+        return
+    with _scheduler_lock:
+        if _scheduler is not None:
+            return
+
+        def run():
+            while True:
+                for table in EXPORT_TABLES:
+                    try:
+                        export_changes(table, EXPORT_DIR)
+                    except Exception:
+                        logger.warning("Scheduled export of %s failed", table, exc_info=True)
+                time.sleep(EXPORT_INTERVAL)
+
+        _scheduler = threading.Thread(target=run, name="scheduled-export", daemon=True)
+        _scheduler.start()
+
+
+# ---------- CLI ----------
+# python export.py changes [out_dir] [csv|parquet]     -> incremental export, e.g. from cron
+# python export.py full table [out_file.csv|.parquet]  -> whole table with names
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "changes":
+        out = sys.argv[2] if len(sys.argv) > 2 else "exports"
+        fmt = sys.argv[3] if len(sys.argv) > 3 else EXPORT_FORMAT
+        for table in EXPORT_TABLES:
+            path, rows = export_changes(table, out, fmt)
+            print(f"{table}: {f'{rows} changed rows -> {path}' if path else 'no changes'}")
+    elif command == "full" and len(sys.argv) > 2 and sys.argv[2] in EXPORT_TABLES:
+        table = sys.argv[2]
+        out = sys.argv[3] if len(sys.argv) > 3 else file_name(table, "csv")
+        fmt = "parquet" if out.endswith(".parquet") else "csv"
+        with open(out, "wb") as f:
+            rows, _ = export_table(f, table, fmt)
+        print(f"Wrote {rows} rows to {out}")
+    else:
+        print("usage: python export.py changes [out_dir] [csv|parquet] | full complaints|reviews [out_file]")
+        sys.exit(1)
@@ -0,0 +1,182 @@
+# indexes.py
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import instrument
+from storage import (
+    STORAGE_BACKEND, Derived, count_vendor_rows, load_data, normalize_name, query_vendor_rows, subscribe,
+)
+
+
+# ---------- Dimension Index ----------
+# O(1) id <-> name lookups for users, vendors and products, shared by every page.
+# Built once from the tables and kept current from storage change notifications.
+DIMENSION_TABLES = ("users", "vendors", "products")
+
+
+def _clean(value):
+    return None if pd.isna(value) else value
+
+
+class DimensionIndex:
+    @instrument("indexes.dimension_index.build")
+    def __init__(self, users_df, vendors_df, products_df):
+        self._lock = threading.Lock()
+        self.user_name = {}
+        self.user_id_by_name = {}
+        self.user_names = []
+        self.user_id_by_normalized_name = {}
+        self.vendor_name = {}
+        self.vendor_id_by_name = {}
+        self.vendor_names = []
+        self.product_name = {}
+        self.product_by_name = {}
+        self.product_names = []
+        self.product_info = {}
+        for row in users_df.to_dict("records"):
+            self.add_user(row)
+        for row in vendors_df.to_dict("records"):
+            self.add_vendor(row)
+        for row in products_df.to_dict("records"):
+            self.add_product(row)
+
+    # Names are not unique; like the old `df[df['name'] == x].values[0]` lookups, the first row wins
+    def add_user(self, row):
+        with self._lock:
+            self.user_name[row["user_id"]] = row["name"]
+            if row["name"] not in self.user_id_by_name:
+                self.user_id_by_name[row["name"]] = row["user_id"]
+                self.user_names.append(row["name"])
+            self.user_id_by_normalized_name.setdefault(normalize_name(row["name"]), row["user_id"])
+
+    def add_vendor(self, row):
+        with self._lock:
+            self.vendor_name[row["vendor_id"]] = row["vendor_name"]
+            if row["vendor_name"] not in self.vendor_id_by_name:
+                self.vendor_id_by_name[row["vendor_name"]] = row["vendor_id"]
+                self.vendor_names.append(row["vendor_name"])
+
+    def add_product(self, row):
+        # product_id -> (product_name, vendor_id, fssai_code)
+        info = (row["product_name"], row.get("vendor_id"), _clean(row.get("fssai_code")))
+        with self._lock:
+            self.product_info[row["product_id"]] = info
+            self.product_name[row["product_id"]] = row["product_name"]
+            if row["product_name"] not in self.product_by_name:
+                self.product_by_name[row["product_name"]] = row["product_id"]
+                self.product_names.append(row["product_name"])
+
+    def product(self, product_name):
+        # -> (product_id, vendor_id, fssai_code)
+        product_id = self.product_by_name[product_name]
+        _, vendor_id, fssai_code = self.product_info[product_id]
+        return product_id, vendor_id, fssai_code
+
+    def add(self, table, row):
+        {"users": self.add_user, "vendors": self.add_vendor, "products": self.add_product}[table](row)
+
+
+def _build_index():
+    return DimensionIndex(load_data("users"), load_data("vendors"), load_data("products"))
+
+
+def _on_change(index, event, table, payload):
+    index.add(table, payload)
+
+
+# Renames and wholesale replaces are rare; rebuild instead of patching the reverse maps
+_index = Derived(_build_index, _on_change, DIMENSION_TABLES, resets=lambda event, table, payload: event != "insert")
+
+
+def get_dimension_index():
+    return _index.get()
+
+
+# ---------- Vendor Partitions ----------
+# One vendor's complaints and reviews, a page at a time. On SQLite the page is read through the
+# (vendor_id, date) index, so it costs the same right after a write as before. The excel backend
+# has no such index: there, row positions of every vendor's rows in the cached tables are kept,
+# so a page takes time proportional to that vendor's data instead of a full-table scan. Between
+# resets, rows only ever get appended (inserts go to the end of a table and updates keep
+# positions), so new rows are indexed by grouping just the tail past the last indexed position.
+PARTITIONED_TABLES = {"complaints": "complaint_date", "reviews": "review_date"}
+
+
+class VendorPartitions:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._positions = {table: {} for table in PARTITIONED_TABLES}
+        self._indexed = dict.fromkeys(PARTITIONED_TABLES, 0)
+
+    def reset(self, table):
+        with self._lock:
+            self._positions[table] = {}
+            self._indexed[table] = 0
+
+    @instrument("indexes.vendor_partitions.extend", target="table")
+    def _current(self, table):
+        # The cached table, with positions extended over any rows appended since the last call
+        df = load_data(table)
+        with self._lock:
+            start = self._indexed[table]
+            if len(df) < start:
+                self._positions[table], start = {}, 0
+            if len(df) > start:
+                tail = df["vendor_id"].iloc[start:]
+                partitions = self._positions[table]
+                for vendor_id, pos in tail.groupby(tail, observed=True, sort=False).indices.items():
+                    pos = pos + start
+                    old = partitions.get(vendor_id)
+                    partitions[vendor_id] = pos if old is None else np.concatenate([old, pos])
+                self._indexed[table] = len(df)
+            return df, self._positions[table]
+
+    def count(self, table, vendor_id):
+        if STORAGE_BACKEND != "excel":
+            return count_vendor_rows(table, vendor_id)
+        _, partitions = self._current(table)
+        return len(partitions.get(vendor_id, ()))
+
+    def page(self, table, vendor_id, page=1, page_size=25, descending=True):
+        # One page of the vendor's rows, newest first (by the table's date column)
+        if STORAGE_BACKEND != "excel":
+            return query_vendor_rows(table, vendor_id, page, page_size, descending)
+        df, partitions = self._current(table)
+        positions = partitions.get(vendor_id)
+        if positions is None:
+            return df.iloc[0:0]
+        # As int64, NaT is the smallest value: undated rows sort last when newest comes first
+        dates = df[PARTITIONED_TABLES[table]].to_numpy()[positions].astype("datetime64[ns]").view("int64")
+        order = np.argsort(dates, kind="stable")
+        if descending:
+            order = order[::-1]
+        start = max(page - 1, 0) * page_size
+        return df.iloc[positions[order[start:start + page_size]]].reset_index(drop=True)
+
+
+_partitions = None
+_partitions_lock = threading.Lock()
+
+
+def _on_partition_change(event, table, payload):
+    if table not in PARTITIONED_TABLES or _partitions is None:
+        return
+    if event == "reset" or (event == "update" and "vendor_id" in payload["changes"]):
+        _partitions.reset(table)
+    # Inserts need nothing here: the next read indexes the appended rows
+
+
+def get_vendor_partitions():
+    global _partitions
+    partitions = _partitions
+    if partitions is None:
+        with _partitions_lock:
+            if _partitions is None:
+                _partitions = VendorPartitions()
+            partitions = _partitions
+    return partitions
+
+
+subscribe(_on_partition_change)
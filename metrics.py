@@ -0,0 +1,220 @@
+# metrics.py
+import bisect
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- Settings ----------
+# FEEDBACK_METRICS=0 turns instrumentation off at import time: decorated functions are returned
+# unwrapped and measure() is a no-op context, so the disabled cost is nothing per call.
+ENABLED = os.environ.get("FEEDBACK_METRICS", "1") != "0"
+# Optional Prometheus textfile (e.g. for node_exporter's textfile collector), rewritten every
+# METRICS_FILE_INTERVAL seconds; "{pid}" in the path gives each server process its own file
+METRICS_FILE = os.environ.get("FEEDBACK_METRICS_FILE")
+METRICS_FILE_INTERVAL = int(os.environ.get("FEEDBACK_METRICS_FILE_INTERVAL", "15"))
+# Histogram bucket upper bounds in seconds, Prometheus' defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = "feedback_operation"
+# The Metrics page is only routed for sessions opened with ?admin=<token>; unset hides it
+ADMIN_TOKEN = os.environ.get("FEEDBACK_ADMIN_TOKEN")
+
+
+# ---------- Registry ----------
+class Series:
+    __slots__ = ("calls", "errors", "rows", "seconds", "max_seconds", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th call, as Prometheus' histogram_quantile would
+        if not self.calls:
+            return None
+        rank, seen = q * self.calls, 0
+        for bound, n in zip(BUCKETS + (self.max_seconds,), self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+
+class Registry:
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def observe(self, operation, target, seconds, rows=0, error=False):
+        key = (operation, target)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = Series()
+            series.calls += 1
+            series.errors += error
+            series.rows += rows
+            series.seconds += seconds
+            series.max_seconds = max(series.max_seconds, seconds)
+            series.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.started = time.time()
+
+    def items(self):
+        with self._lock:
+            return sorted(self._series.items())
+
+    def table(self):
+        rows = []
+        for (operation, target), s in self.items():
+            rows.append({
+                "operation": operation,
+                "target": target,
+                "calls": s.calls,
+                "errors": s.errors,
+                "rows": s.rows,
+                "total_ms": round(s.seconds * 1000, 2),
+                "mean_ms": round(s.seconds * 1000 / s.calls, 3),
+                "p50_ms": round(s.quantile(0.5) * 1000, 2),
+                "p95_ms": round(s.quantile(0.95) * 1000, 2),
+                "max_ms": round(s.max_seconds * 1000, 2),
+            })
+        return pd.DataFrame(rows, columns=["operation", "target", "calls", "errors", "rows", "total_ms",
+                                           "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+
+    def prometheus_text(self):
+        # Prometheus text exposition format 0.0.4
+        def labels(operation, target, **extra):
+            pairs = {"operation": operation, "target": target, **extra}
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + "}"
+
+        items = self.items()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_seconds Time spent per page and data operation.",
+            f"# TYPE {METRIC_PREFIX}_seconds histogram",
+        ]
+        for (operation, target), s in items:
+            cumulative = 0
+            for bound, n in zip(BUCKETS, s.buckets):
+                cumulative += n
+                lines.append(f"{METRIC_PREFIX}_seconds_bucket{labels(operation, target, le=repr(bound))} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}_seconds_bucket{labels(operation, target, le='+Inf')} {s.calls}")
+            lines.append(f"{METRIC_PREFIX}_seconds_sum{labels(operation, target)} {s.seconds:.6f}")
+            lines.append(f"{METRIC_PREFIX}_seconds_count{labels(operation, target)} {s.calls}")
+        for name, attr, help_text in (("rows_total", "rows", "Rows read or written."),
+                                      ("errors_total", "errors", "Calls that raised.")):
+            lines += [f"# HELP {METRIC_PREFIX}_{name} {help_text}", f"# TYPE {METRIC_PREFIX}_{name} counter"]
+            lines += [f"{METRIC_PREFIX}_{name}{labels(op, target)} {getattr(s, attr)}" for (op, target), s in items]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+# ---------- Instrumentation ----------
+def instrument(operation, target=None, rows=None):
+    # Decorator. target: name of the argument that labels each call (e.g. "table");
+    # rows(result, *args, **kwargs) -> number of rows the call read or wrote.
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        params = list(inspect.signature(fn).parameters)
+        position = params.index(target) if target else None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if target is None:
+                label = ""
+            elif target in kwargs:
+                label = kwargs[target]
+            else:
+                label = args[position] if position < len(args) else ""
+            start = time.perf_counter()
+            error = True
+            try:
+                result = fn(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                n = rows(result, *args, **kwargs) if rows is not None and not error else 0
+                registry.observe(operation, label, time.perf_counter() - start, n, error)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def _measure(operation, target, rows):
+    start = time.perf_counter()
+    error = True
+    try:
+        yield
+        error = False
+    finally:
+        registry.observe(operation, target, time.perf_counter() - start, rows, error)
+
+
+def measure(operation, target="", rows=0):
+    # Context manager for a block inside a function, e.g. a filter or a figure build
+    return _measure(operation, target, rows) if ENABLED else nullcontext()
+
+
+def result_len(result, *args, **kwargs):
+    return len(result)
+
+
+# ---------- Export ----------
+def write_prometheus_file(path=None):
+    path = (path or METRICS_FILE).format(pid=os.getpid())
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.prometheus_text())
+    os.replace(tmp_path, path)
+    return path
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def start_file_exporter():
+    # Starts this process's thread rewriting METRICS_FILE every METRICS_FILE_INTERVAL seconds,
+    # once: app.py calls it on every rerun
+    global _exporter
+    if not ENABLED or not METRICS_FILE or _exporter is not None:
+        return
+    with _exporter_lock:
+        if _exporter is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(METRICS_FILE_INTERVAL)
+                try:
+                    write_prometheus_file()
+                except OSError:
+                    logger.warning("Could not write metrics file %s", METRICS_FILE, exc_info=True)
+
+        _exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        _exporter.start()
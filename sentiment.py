@@ -0,0 +1,173 @@
+# sentiment.py
+import hashlib
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+from textblob import TextBlob
+
+from storage import get_connection, init_db, load_data, update_records
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- Scoring ----------
+# TextBlob polarity in [-1, 1] mapped onto the labels the app already uses
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+SENTIMENT_COLUMNS = {
+    "reviews": ("review_id", "review_text", "review_sentiment"),
+    "complaints": ("complaint_id", "complaint_text", "complaint_sentiment"),
+}
+
+
+def _normalize(text):
+    return " ".join(str(text).split()) if text is not None and not pd.isna(text) else ""
+
+
+def text_hash(text):
+    return hashlib.sha1(_normalize(text).encode("utf-8")).hexdigest()
+
+
+def polarity(text):
+    text = _normalize(text)
+    return TextBlob(text).sentiment.polarity if text else 0.0
+
+
+def sentiment_label(score):
+    if score >= POSITIVE_THRESHOLD:
+        return "Positive"
+    if score <= NEGATIVE_THRESHOLD:
+        return "Negative"
+    return "Neutral"
+
+
+def _score_chunk(texts):
+    # Runs in a worker process
+    return [polarity(text) for text in texts]
+
+
+# ---------- Result Cache ----------
+# Polarity keyed by the hash of the normalized text: in memory, backed by a table in the
+# app database so identical texts are never re-scored, even across restarts.
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _ensure_table():
+    init_db()
+    conn = get_connection()
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS sentiment_cache (text_hash TEXT PRIMARY KEY, polarity REAL NOT NULL)")
+    return conn
+
+
+def _cached(hashes):
+    with _memo_lock:
+        found = {h: _memo[h] for h in hashes if h in _memo}
+    missing = [h for h in hashes if h not in found]
+    conn = _ensure_table()
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        rows = conn.execute(
+            f"SELECT text_hash, polarity FROM sentiment_cache WHERE text_hash IN ({', '.join('?' * len(chunk))})", chunk
+        ).fetchall()
+        found.update(rows)
+    with _memo_lock:
+        _memo.update(found)
+    return found
+
+
+def _remember(scores):
+    with _memo_lock:
+        _memo.update(scores)
+    conn = _ensure_table()
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO sentiment_cache (text_hash, polarity) VALUES (?, ?)", scores.items())
+
+
+# ---------- Batch Pipeline ----------
+def score_texts(texts, workers=None, chunk_size=2000):
+    # Polarity for each text. Texts are de-duplicated by hash, cache hits are skipped and the
+    # rest is scored in chunks across a process pool (TextBlob itself is per-text Python).
+    hashes = [text_hash(t) for t in texts]
+    unique = dict(zip(hashes, texts))
+    scores = _cached(list(unique))
+    todo = [(h, t) for h, t in unique.items() if h not in scores]
+    if todo:
+        chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+        texts_by_chunk = [[t for _, t in chunk] for chunk in chunks]
+        if workers == 1 or len(chunks) == 1:
+            results = list(map(_score_chunk, texts_by_chunk))
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(_score_chunk, texts_by_chunk))
+        fresh = {h: s for chunk, res in zip(chunks, results) for (h, _), s in zip(chunk, res)}
+        _remember(fresh)
+        scores.update(fresh)
+    return [scores[h] for h in hashes]
+
+
+def score_backlog(tables=("reviews", "complaints"), rescore=False, workers=None):
+    # Fills in missing sentiment labels (all of them with rescore=True); one write per table
+    counts = {}
+    for table in tables:
+        key, text_col, label_col = SENTIMENT_COLUMNS[table]
+        df = load_data(table)
+        if not rescore and label_col in df.columns:
+            df = df[df[label_col].isna() | (df[label_col] == "")]
+        if df.empty:
+            counts[table] = 0
+            continue
+        labels = [sentiment_label(s) for s in score_texts(df[text_col].tolist(), workers=workers)]
+        update_records(table, {k: {label_col: label} for k, label in zip(df[key], labels)})
+        counts[table] = len(df)
+    return counts
+
+
+# ---------- Background Scoring ----------
+# New submissions are stored first and labelled afterwards, so the submit button never waits
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment")
+
+
+def _label_records(table, keys, texts):
+    _, _, label_col = SENTIMENT_COLUMNS[table]
+    scores = score_texts(texts, workers=1)
+    update_records(table, {k: {label_col: sentiment_label(s)} for k, s in zip(keys, scores)})
+
+
+def _log_failure(future):
+    # Nobody waits on these futures, so a failed scoring or write-back would otherwise vanish;
+    # the rows stay unlabelled until `python sentiment.py backlog` picks them up
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Background sentiment scoring failed", exc_info=future.exception())
+
+
+def _submit(table, keys, texts):
+    future = _background.submit(_label_records, table, keys, texts)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def score_in_background(table, key_value, text):
+    return _submit(table, [key_value], [text])
+
+
+def score_many_in_background(table, keys, texts):
+    # For bulk imports: the whole batch is labelled and written back in one update
+    return _submit(table, list(keys), list(texts))
+
+
+# ---------- CLI ----------
+# python sentiment.py backlog [--rescore]  -> label every review/complaint missing a sentiment
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["backlog"]:
+        done = score_backlog(rescore="--rescore" in sys.argv, workers=os.cpu_count())
+        for table, n in done.items():
+            print(f"{table}: scored {n} rows")
+    else:
+        print("usage: python sentiment.py backlog [--rescore]")
+        sys.exit(1)
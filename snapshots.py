@@ -0,0 +1,66 @@
+# snapshots.py
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- Binary Snapshots ----------
+# An uncompressed Arrow IPC (Feather v2) copy of each workbook, stored next to it as
+# <name>.arrow and memory-mapped on load. The snapshot records the mtime/size/inode of the workbook
+# it was made from, and is only used while the workbook still matches.
+STAMP_KEY = b"source_stamp"
+
+
+def snapshot_path(xlsx_path):
+    return os.path.splitext(xlsx_path)[0] + ".arrow"
+
+
+def _stamp(path):
+    # os.replace gives every rewrite a new inode, even within one mtime tick
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}:{st.st_ino}".encode()
+
+
+def read_snapshot(xlsx_path):
+    path = snapshot_path(xlsx_path)
+    try:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            if (reader.schema.metadata or {}).get(STAMP_KEY) != _stamp(xlsx_path):
+                return None
+            return reader.read_all().to_pandas()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+
+
+def write_snapshot(xlsx_path, df, stamp=None):
+    # stamp: of the workbook as it was when df was read from it, if that was not just now
+    path = snapshot_path(xlsx_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[STAMP_KEY] = stamp or _stamp(xlsx_path)
+        feather.write_feather(table.replace_schema_metadata(metadata), tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except (pa.ArrowException, OSError):
+        # A snapshot is only an accelerator; the workbook stays the source of truth
+        logger.warning("Could not write snapshot for %s", xlsx_path, exc_info=True)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_workbook(xlsx_path):
+    df = read_snapshot(xlsx_path)
+    if df is None:
+        # Stamped before reading, so a workbook replaced mid-read leaves the snapshot stale
+        stamp = _stamp(xlsx_path)
+        df = pd.read_excel(xlsx_path)
+        write_snapshot(xlsx_path, df, stamp)
+    return df
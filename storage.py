@@ -0,0 +1,1270 @@
+# storage.py
+import logging
+import operator
+import os
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from cache import TableCache
+from metrics import instrument, result_len
+from schema import DATE_COLUMNS, apply_schema
+from snapshots import read_workbook, write_snapshot
+from wal import WriteAheadLog, apply_entries, write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- File Paths ----------
+DATA_DIR = "Data"
+DB_FILE = os.environ.get("FEEDBACK_DB", os.path.join(DATA_DIR, "feedback.db"))
+USERS_FILE = os.path.join(DATA_DIR, "users_db.xlsx")
+VENDORS_FILE = os.path.join(DATA_DIR, "vendors_db.xlsx")
+PRODUCTS_FILE = os.path.join(DATA_DIR, "products_db.xlsx")
+COMPLAINTS_FILE = os.path.join(DATA_DIR, "complaints_db.xlsx")
+REVIEWS_FILE = os.path.join(DATA_DIR, "rexiews_db.xlsx")
+
+# "sqlite" keeps everything in DB_FILE, "excel" keeps the old one-workbook-per-table layout
+STORAGE_BACKEND = os.environ.get("FEEDBACK_BACKEND", "sqlite")
+# excel backend: writes are appended here and folded into the workbooks in the background
+WRITE_LOG_FILE = os.path.join(DATA_DIR, "pending_writes.jsonl")
+COMPACT_INTERVAL = int(os.environ.get("FEEDBACK_COMPACT_INTERVAL", "30"))
+
+# ---------- Schema ----------
+TABLES = {
+    "users": {
+        "file": USERS_FILE,
+        "key": "user_id",
+        "prefix": "U",
+        "columns": {
+            "user_id": "TEXT PRIMARY KEY",
+            "name": "TEXT NOT NULL",
+            "state": "TEXT",
+            "row_version": "INTEGER",
+        },
+        "indexes": ["name", "row_version"],
+    },
+    "vendors": {
+        "file": VENDORS_FILE,
+        "key": "vendor_id",
+        "prefix": "V",
+        "columns": {
+            "vendor_id": "TEXT PRIMARY KEY",
+            "vendor_name": "TEXT NOT NULL",
+            "state": "TEXT",
+            "fssai_code": "INTEGER",
+            "row_version": "INTEGER",
+        },
+        "indexes": ["vendor_name", "row_version"],
+    },
+    "products": {
+        "file": PRODUCTS_FILE,
+        "key": "product_id",
+        "prefix": "P",
+        "columns": {
+            "product_id": "TEXT PRIMARY KEY",
+            "product_name": "TEXT NOT NULL",
+            "category": "TEXT",
+            "vendor_id": "TEXT",
+            "fssai_code": "INTEGER",
+            "is_verified": "INTEGER",
+            "row_version": "INTEGER",
+        },
+        "indexes": ["product_name", "vendor_id", "row_version"],
+    },
+    "complaints": {
+        "file": COMPLAINTS_FILE,
+        "key": "complaint_id",
+        "prefix": "C",
+        "columns": {
+            "complaint_id": "TEXT PRIMARY KEY",
+            "user_id": "TEXT",
+            "product_id": "TEXT",
+            "vendor_id": "TEXT",
+            "fssai_code": "INTEGER",
+            "complaint_text": "TEXT",
+            "complaint_status": "TEXT",
+            "complaint_priority": "TEXT",
+            "complaint_date": "TEXT",
+            "complaint_image_url": "TEXT",
+            "complaint_sentiment": "TEXT",
+            "row_version": "INTEGER",
+        },
+        "date": "complaint_date",
+        "text": "complaint_text",
+        "indexes": ["user_id", "product_id", ("vendor_id", "complaint_date"), "complaint_status", "complaint_date",
+                    "row_version"],
+    },
+    "reviews": {
+        "file": REVIEWS_FILE,
+        "key": "review_id",
+        "prefix": "R",
+        "columns": {
+            "review_id": "TEXT PRIMARY KEY",
+            "user_id": "TEXT",
+            "product_id": "TEXT",
+            "vendor_id": "TEXT",
+            "rating": "INTEGER",
+            "review_text": "TEXT",
+            "review_date": "TEXT",
+            "review_sentiment": "TEXT",
+            "row_version": "INTEGER",
+        },
+        "date": "review_date",
+        "text": "review_text",
+        "indexes": ["user_id", "product_id", ("vendor_id", "review_date"), "review_date", "row_version"],
+    },
+}
+
+BOOL_COLUMNS = {"is_verified"}
+# Indexed with the text of complaints and reviews, see _create_text_index
+TEXT_FILTER_COLUMNS = ["vendor_id", "product_id"]
+# Every row carries the table version of the write that last touched it, which is what
+# incremental exports and sync_changes select on. Rows from before the column existed are NULL.
+VERSION_COLUMN = "row_version"
+
+
+# ---------- Connection ----------
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+_text_index = False  # FTS5 is available and the text indexes exist
+
+
+def get_connection():
+    # sqlite3 connections can't be shared between threads and Streamlit runs each session in its own
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_FILE) or ".", exist_ok=True)
+        conn = sqlite3.connect(DB_FILE, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    return conn
+
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def init_db():
+    global _initialized, _text_index
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        is_new = not os.path.exists(DB_FILE)
+        conn = get_connection()
+        with conn:
+            for table, spec in TABLES.items():
+                cols = ", ".join(f"{name} {sql_type}" for name, sql_type in spec["columns"].items())
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols})")
+                # Columns added after a database was created
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for name, sql_type in spec["columns"].items():
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+                # A tuple is a composite index, e.g. (vendor_id, date) for one vendor's newest rows
+                for cols in spec["indexes"]:
+                    cols = (cols,) if isinstance(cols, str) else cols
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(cols)} ON {table} ({', '.join(cols)})")
+            conn.execute("CREATE TABLE IF NOT EXISTS id_sequences (table_name TEXT PRIMARY KEY, last_value INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS user_requests (idempotency_key TEXT PRIMARY KEY, user_id TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS table_versions (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            if "reset_version" not in {row[1] for row in conn.execute("PRAGMA table_info(table_versions)")}:
+                conn.execute("ALTER TABLE table_versions ADD COLUMN reset_version INTEGER NOT NULL DEFAULT 0")
+            if "workbook_stamp" not in {row[1] for row in conn.execute("PRAGMA table_info(table_versions)")}:
+                conn.execute("ALTER TABLE table_versions ADD COLUMN workbook_stamp TEXT")
+            conn.executemany("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", [(t,) for t in TABLES])
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS export_runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, feed TEXT NOT NULL, "
+                "table_name TEXT NOT NULL, from_version INTEGER, to_version INTEGER NOT NULL, rows INTEGER NOT NULL, "
+                "path TEXT, exported_at TEXT NOT NULL)"
+            )
+            _text_index = all(_create_text_index(conn, t, spec["text"]) for t, spec in TABLES.items() if "text" in spec)
+        _initialized = True
+    # First run: seed the database from the existing workbooks
+    if is_new and STORAGE_BACKEND != "excel":
+        import_excel()
+
+
+def _create_text_index(conn, table, col):
+    # FTS5 index over the table's text column, stored as an external-content table: it keeps
+    # only the inverted index and reads the text back from `table` by rowid. The vendor and
+    # product ids are indexed next to the text, so those filters are intersected inside the
+    # index instead of row by row. Updates and deletes reach it through triggers; inserts are
+    # indexed by _index_new_rows. (A VACUUM may renumber the rowids; run
+    # `python storage.py reindex` after one.)
+    fts = f"{table}_fts"
+    cols = [col] + TEXT_FILTER_COLUMNS
+    names = ", ".join(cols)
+    new_values = ", ".join(f"new.{c}" for c in cols)
+    old_values = ", ".join(f"old.{c}" for c in cols)
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts,)).fetchone()
+    try:
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', "
+            f"content_rowid='rowid', tokenize='porter unicode61')"
+        )
+    except sqlite3.OperationalError:
+        logger.warning("SQLite was built without FTS5; text search falls back to scanning")
+        return False
+    insert = f"INSERT INTO {fts} (rowid, {names}) VALUES (new.rowid, {new_values});"
+    delete = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.rowid, {old_values});"
+    triggers = {
+        "delete": f"AFTER DELETE ON {table} BEGIN {delete} END",
+        "update": f"AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END",
+    }
+    for name, body in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_{name} {body}")
+    if not exists:
+        # Rows written before the index existed
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    return True
+
+
+def _last_rowid(conn, table):
+    return conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+
+
+def _index_new_rows(conn, table, after_rowid):
+    # Rows inserted since after_rowid, indexed in one statement in the writing transaction. Not
+    # a trigger: FTS5 flushes its buffer at every row's statement savepoint when fed from one,
+    # which makes batches about five times slower.
+    if _text_index and "text" in TABLES[table]:
+        cols = ", ".join([TABLES[table]["text"]] + TEXT_FILTER_COLUMNS)
+        conn.execute(
+            f"INSERT INTO {table}_fts (rowid, {cols}) SELECT rowid, {cols} FROM {table} WHERE rowid > ?",
+            (after_rowid,),
+        )
+
+
+def rebuild_text_indexes():
+    init_db()
+    with _write_transaction() as conn:
+        for table, spec in TABLES.items():
+            if "text" in spec and _text_index:
+                conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+# ---------- Value Conversion ----------
+def _to_sql_value(value):
+    if value is None or isinstance(value, str):
+        return value
+    if hasattr(value, "isoformat"):  # datetime, pd.Timestamp, NaT
+        if pd.isna(value):
+            return None
+        return pd.Timestamp(value).isoformat(sep=" ")
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if hasattr(value, "item"):  # numpy scalars
+        value = value.item()
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _row_values(table, row):
+    return [_to_sql_value(row.get(col)) for col in TABLES[table]["columns"]]
+
+
+def _versioned(values, version):
+    # values: a row or a dict of changes about to be written in the write that produces `version`
+    return {**values, VERSION_COLUMN: version}
+
+
+def _from_sql(table, df):
+    for col in df.columns:
+        if col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col], format="ISO8601", errors="coerce")
+        elif col in BOOL_COLUMNS:
+            df[col] = df[col].astype("boolean")
+    return df
+
+
+# ---------- Table Access ----------
+@instrument("storage.load_table", target="table", rows=result_len)
+def load_table(table):
+    init_db()
+    cols = ", ".join(TABLES[table]["columns"])
+    df = pd.read_sql_query(f"SELECT {cols} FROM {table} ORDER BY rowid", get_connection())
+    return _from_sql(table, df)
+
+
+def replace_table(table, df):
+    init_db()
+    cols = list(TABLES[table]["columns"])
+    df = df.reindex(columns=cols)
+    with _table_write(table) as conn:
+        version = _bump_version(conn, table)
+        _mark_reset(conn, table)
+        rows = [_row_values(table, _versioned(row, version)) for row in df.to_dict("records")]
+        conn.execute(f"DELETE FROM {table}")
+        last_rowid = _last_rowid(conn, table)
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", rows
+        )
+        _index_new_rows(conn, table, last_rowid)
+        # Never let the sequence fall behind ids that were written explicitly
+        conn.execute(
+            "UPDATE id_sequences SET last_value = MAX(last_value, ?) WHERE table_name = ?",
+            (_max_existing_id(conn, table), table),
+        )
+
+
+def insert_rows(table, rows):
+    init_db()
+    cols = list(TABLES[table]["columns"])
+    with _table_write(table) as conn:
+        version = _bump_version(conn, table)
+        values = [_row_values(table, _versioned(row, version)) for row in rows]
+        last_rowid = _last_rowid(conn, table)
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", values
+        )
+        _index_new_rows(conn, table, last_rowid)
+
+
+def insert_row(table, row):
+    insert_rows(table, [row])
+
+
+def update_row(table, key_value, changes):
+    init_db()
+    key = TABLES[table]["key"]
+    with _table_write(table) as conn:
+        # Writes are serialized, so the version this update will produce is known up front
+        changes = _versioned(changes, _table_version(conn, table) + 1)
+        assignments = ", ".join(f"{col} = ?" for col in changes)
+        values = [_to_sql_value(v) for v in changes.values()] + [key_value]
+        cur = conn.execute(f"UPDATE {table} SET {assignments} WHERE {key} = ?", values)
+        if cur.rowcount:
+            _bump_version(conn, table)
+    return cur.rowcount
+
+
+def update_rows(table, updates):
+    # updates: {key_value: {column: value}}, applied in one transaction. Returns the rows updated.
+    init_db()
+    key = TABLES[table]["key"]
+    count = 0
+    with _table_write(table) as conn:
+        version = _bump_version(conn, table)
+        by_columns = {}
+        for key_value, changes in updates.items():
+            changes = _versioned(changes, version)
+            by_columns.setdefault(tuple(changes), []).append(
+                [_to_sql_value(v) for v in changes.values()] + [key_value]
+            )
+        for columns, rows in by_columns.items():
+            assignments = ", ".join(f"{col} = ?" for col in columns)
+            count += conn.executemany(f"UPDATE {table} SET {assignments} WHERE {key} = ?", rows).rowcount
+    return count
+
+
+def update_where(table, changes, conditions):
+    # One UPDATE of every row matching `conditions` (see _conditions). Returns the updated keys.
+    init_db()
+    key = TABLES[table]["key"]
+    where, params = _where(conditions)
+    with _table_write(table) as conn:
+        # The write lock is held from here on, so the keys are exactly the rows the UPDATE changes
+        keys = [row[0] for row in conn.execute(f"SELECT {key} FROM {table} {where}", params)]
+        if keys:
+            changes = _versioned(changes, _bump_version(conn, table))
+            assignments = ", ".join(f"{col} = ?" for col in changes)
+            conn.execute(f"UPDATE {table} SET {assignments} {where}", [_to_sql_value(v) for v in changes.values()] + params)
+    return keys
+
+
+# ---------- Write Path ----------
+# Every write, from any process and either backend, goes through _write_transaction, so there is
+# a single writer at a time. The process-local lock keeps this process's threads off SQLite's
+# busy-wait; BEGIN IMMEDIATE is what serializes the processes.
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def _write_transaction():
+    # BEGIN IMMEDIATE takes the database write lock up front, so read-then-write sequences
+    # are atomic across processes as well as threads
+    init_db()
+    conn = get_connection()
+    with _write_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+# ---------- Table Versions ----------
+# One counter per table in table_versions, bumped inside the transaction of every write to
+# that table, and stamped on the rows the write touched. A process compares the counters with
+# the ones it last saw to find the tables other processes changed, and replays just the rows
+# stamped since. reset_version is the last version that replaced the table wholesale.
+# workbook_stamp is the excel backend's workbook file as the app last wrote it.
+_seen_versions = {}  # table -> (version, last rowid) as of this process's last look
+_seen_lock = threading.RLock()
+SYNC_REPLAY_LIMIT = 10_000
+
+
+def _table_version(conn, table):
+    return conn.execute("SELECT version FROM table_versions WHERE table_name = ?", (table,)).fetchone()[0]
+
+
+def _bump_version(conn, table):
+    # Returns the new version
+    conn.execute("UPDATE table_versions SET version = version + 1 WHERE table_name = ?", (table,))
+    return _table_version(conn, table)
+
+
+def _mark_reset(conn, table):
+    conn.execute("UPDATE table_versions SET reset_version = version WHERE table_name = ?", (table,))
+
+
+def _seen_rowid(conn, table):
+    # Rows past it were inserted after the version seen with it; the excel backend's log says so itself
+    return None if STORAGE_BACKEND == "excel" else _last_rowid(conn, table)
+
+
+def table_version(table):
+    init_db()
+    return _table_version(get_connection(), table)
+
+
+@contextmanager
+def _table_write(table):
+    # The block must call _bump_version if it changed the table
+    with _write_transaction() as conn:
+        before = _table_version(conn, table)
+        yield conn
+        after = (_table_version(conn, table), _seen_rowid(conn, table))
+    # Our own write needs no replay, unless another process wrote since we last looked
+    with _seen_lock:
+        seen = _seen_versions.get(table)
+        if seen is not None and seen[0] == before:
+            _seen_versions[table] = after
+
+
+def _event_values(values):
+    # Log entries keep dates as ISO strings
+    return {col: pd.to_datetime(v, errors="coerce") if col in DATE_COLUMNS else v for col, v in values.items()}
+
+
+def _entry_version(entry):
+    return (entry.get("row") or entry.get("changes") or {}).get(VERSION_COLUMN) or 0
+
+
+def _changes_since(conn, table, seen, version):
+    # The writes that took `table` from the `seen` state to `version`, as [(event, payload)],
+    # or None when they can't be replayed and the table has to be rebuilt
+    key = TABLES[table]["key"]
+    if STORAGE_BACKEND == "excel":
+        # Entries a compaction already folded into the workbook leave a gap in the versions
+        entries = [e for e in write_log.entries(table) if seen[0] < _entry_version(e) <= version]
+        covered = {_entry_version(e) for e in entries} == set(range(seen[0] + 1, version + 1))
+        if not covered or len(entries) > SYNC_REPLAY_LIMIT:
+            return None
+        return [("insert", _event_values(e["row"])) if e["op"] == "insert"
+                else ("update", {"key": e["key"], "changes": _event_values(e["changes"])}) for e in entries]
+    count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {VERSION_COLUMN} > ?", (seen[0],)).fetchone()[0]
+    if count > SYNC_REPLAY_LIMIT:
+        return None
+    cols = ", ".join(TABLES[table]["columns"])
+    # Sorted here: an ORDER BY rowid would have SQLite walk the table instead of the row_version index
+    df = pd.read_sql_query(f"SELECT rowid AS row_id, {cols} FROM {table} WHERE {VERSION_COLUMN} > ?",
+                           conn, params=[seen[0]]).sort_values("row_id", kind="stable")
+    row_ids = df.pop("row_id").tolist()
+    events = []
+    for row_id, row in zip(row_ids, _from_sql(table, df).to_dict("records")):
+        if row_id > seen[1]:
+            events.append(("insert", row))
+        else:
+            # Which columns changed is not recorded; the row's current values are sent as the changes
+            events.append(("update", {"key": row.pop(key), "changes": row}))
+    return events
+
+
+@instrument("storage.sync_changes", rows=result_len)
+def sync_changes():
+    # Call once per rerun. Rows other processes wrote since the last call are replayed to the
+    # listeners as "insert"/"update" events. A table another process replaced wholesale, or
+    # with more than SYNC_REPLAY_LIMIT changed rows, is announced as "reset" and rebuilt.
+    # Replays may repeat a write this process already applied; listeners treat an insert of a
+    # row they hold as an update.
+    if STORAGE_BACKEND == "excel":
+        _check_workbooks()
+    init_db()
+    conn = get_connection()
+    changed = []
+    with _seen_lock:
+        conn.execute("BEGIN")  # one read snapshot for the versions and the rows
+        try:
+            states = conn.execute("SELECT table_name, version, reset_version FROM table_versions").fetchall()
+            for table, version, reset_version in states:
+                seen = _seen_versions.get(table)
+                if seen is None or seen[0] != version:
+                    if seen is not None:
+                        events = None if reset_version > seen[0] else _changes_since(conn, table, seen, version)
+                        changed.append((table, events))
+                    _seen_versions[table] = (version, _seen_rowid(conn, table))
+        finally:
+            conn.commit()
+        for table, events in changed:
+            if events is None:
+                _written(table, "reset")
+                continue
+            table_cache.after_write(table)
+            for event, payload in events:
+                _notify(event, table, payload)
+    return [table for table, _ in changed]
+
+
+# ---------- ID Allocation ----------
+def _max_existing_id(conn, table):
+    spec = TABLES[table]
+    if STORAGE_BACKEND == "excel":
+        ids = load_data(table)[spec["key"]].astype(str)
+        nums = pd.to_numeric(ids.str.replace(spec["prefix"], "", regex=False), errors="coerce")
+        return int(nums.max()) if nums.notna().any() else 0
+    row = conn.execute(
+        f"SELECT MAX(CAST(SUBSTR({spec['key']}, ?) AS INTEGER)) FROM {table}",
+        (len(spec["prefix"]) + 1,),
+    ).fetchone()
+    return row[0] or 0
+
+
+def _next_ids(conn, table, count):
+    # The sequence is seeded from the current max id only once
+    prefix = TABLES[table]["prefix"]
+    row = conn.execute("SELECT last_value FROM id_sequences WHERE table_name = ?", (table,)).fetchone()
+    last = row[0] if row is not None else _max_existing_id(conn, table)
+    conn.execute(
+        "INSERT OR REPLACE INTO id_sequences (table_name, last_value) VALUES (?, ?)",
+        (table, last + count),
+    )
+    return [f"{prefix}{n:03d}" for n in range(last + 1, last + count + 1)]
+
+
+@instrument("storage.allocate_ids", target="table", rows=result_len)
+def allocate_ids(table, count=1):
+    with _write_transaction() as conn:
+        return _next_ids(conn, table, count)
+
+
+def allocate_id(table):
+    return allocate_ids(table, 1)[0]
+
+
+# ---------- Excel Import / Export ----------
+@instrument("storage.import_excel")
+def import_excel(tables=None):
+    init_db()
+    for table in tables or TABLES:
+        file_path = TABLES[table]["file"]
+        if not os.path.exists(file_path):
+            continue
+        # Includes anything the excel backend still has waiting in its write log
+        df = _replay(table, _read_workbook(table), write_log.entries(table))
+        replace_table(table, df)
+        _written(table, "reset")
+
+
+def export_excel(out_dir=DATA_DIR, tables=None):
+    paths = []
+    for table in tables or TABLES:
+        file_path = os.path.join(out_dir, os.path.basename(TABLES[table]["file"]))
+        load_table(table).to_excel(file_path, index=False)
+        paths.append(file_path)
+    return paths
+
+
+# ---------- Backend Dispatch ----------
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+# ---------- Excel Backend ----------
+write_log = WriteAheadLog(WRITE_LOG_FILE)
+_compactor = None
+_compactor_lock = threading.Lock()
+# Keys of every row loaded or inserted here, so an update can be checked without a reload (the
+# write before it has just invalidated the cached table). Only a key missing here, e.g. a row
+# another process inserted since, costs a look at the table.
+_known_keys = {}
+
+
+def _read_workbook(table):
+    # Served from the Arrow snapshot while it matches the workbook
+    df = read_workbook(TABLES[table]["file"])
+    key = TABLES[table]["key"]
+    df[key] = df[key].astype(str)
+    return df
+
+
+def _write_workbook(table, df):
+    write_atomic(TABLES[table]["file"], lambda f: df.to_excel(f, index=False, engine="openpyxl"))
+    write_snapshot(TABLES[table]["file"], df)
+
+
+def _stamp_text(table):
+    stamp = _file_stamp(TABLES[table]["file"])
+    return None if stamp is None else " ".join(map(str, stamp))
+
+
+def _record_workbook(conn, table):
+    conn.execute("UPDATE table_versions SET workbook_stamp = ? WHERE table_name = ?", (_stamp_text(table), table))
+
+
+def _check_workbooks():
+    # A workbook that differs from the one the app last wrote was edited outside it: the table
+    # is marked reset so every process rebuilds what it derived from it. Not through
+    # _table_write, which would count the reset as already seen here.
+    init_db()
+    recorded = dict(get_connection().execute("SELECT table_name, workbook_stamp FROM table_versions").fetchall())
+    for table in TABLES:
+        if recorded.get(table) == _stamp_text(table):
+            continue
+        with _write_transaction() as conn:
+            before = conn.execute("SELECT workbook_stamp FROM table_versions WHERE table_name = ?", (table,)).fetchone()[0]
+            if before is not None and before != _stamp_text(table):
+                _bump_version(conn, table)
+                _mark_reset(conn, table)
+            _record_workbook(conn, table)
+
+
+def _replay(table, df, entries):
+    df = apply_entries(df, TABLES[table]["key"], entries)
+    for col in DATE_COLUMNS & set(df.columns):
+        df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+@instrument("storage.fold_write_log", rows=lambda result, entries: len(entries))
+def _fold_log(entries):
+    # An outside edit is recorded first; the rewrite below would hide it
+    _check_workbooks()
+    by_table = {}
+    for entry in entries:
+        by_table.setdefault(entry["table"], []).append(entry)
+    for table, table_entries in by_table.items():
+        _write_workbook(table, _replay(table, _read_workbook(table), table_entries))
+        with _write_transaction() as conn:
+            _record_workbook(conn, table)
+
+
+def compact_write_log():
+    return write_log.compact(_fold_log)
+
+
+def _ensure_compactor():
+    # Recovery on startup: the first pass folds whatever the last process left in the log
+    global _compactor
+    if _compactor is None:
+        with _compactor_lock:
+            if _compactor is None:
+                _compactor = write_log.start_compactor(_fold_log, COMPACT_INTERVAL)
+
+
+def _existing_keys(table, keys):
+    if not set(keys) <= _known_keys.get(table, set()):
+        load_data(table)
+    known = _known_keys.get(table, set())
+    return [key_value for key_value in keys if key_value in known]
+
+
+def _log_write(entries):
+    for entry in entries:
+        if "row" in entry:
+            entry["row"] = {col: _to_sql_value(v) for col, v in entry["row"].items()}
+        if "changes" in entry:
+            entry["changes"] = {col: _to_sql_value(v) for col, v in entry["changes"].items()}
+    write_log.append(entries)
+
+
+def _source_signature(table):
+    init_db()
+    version = _table_version(get_connection(), table)
+    if STORAGE_BACKEND == "excel":
+        # Compaction rewrites the workbook without bumping the version
+        return version, _file_stamp(TABLES[table]["file"])
+    return version
+
+
+@instrument("storage.load_uncached", target="table", rows=result_len)
+def _load_uncached(table):
+    if STORAGE_BACKEND == "excel":
+        # Last snapshot plus whatever is still waiting in the write log. The log is read first:
+        # if a compaction lands in between, its entries are simply replayed twice (harmless),
+        # whereas in the other order they could be missing from both.
+        entries = write_log.entries(table)
+        df = _replay(table, _read_workbook(table), entries)
+        _known_keys[table] = set(df[TABLES[table]["key"]])
+    else:
+        df = load_table(table)
+    return apply_schema(df, TABLES[table]["key"])
+
+
+table_cache = TableCache(_load_uncached, _source_signature)
+
+
+# ---------- Change Notifications ----------
+# Derived in-memory structures (lookup indexes, aggregates) subscribe here and apply each
+# write incrementally. listener(event, table, payload) with event one of:
+#   "insert"  payload = row dict
+#   "update"  payload = {"key": key_value, "changes": {...}}
+#   "reset"   payload = None, the table was replaced wholesale and must be rebuilt
+_listeners = []
+
+
+def subscribe(listener):
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _notify(event, table, payload=None):
+    for listener in list(_listeners):
+        listener(event, table, payload)
+
+
+def _written(table, event, payload=None):
+    table_cache.after_write(table)
+    _notify(event, table, payload)
+
+
+class Derived:
+    # One process-wide structure built from the tables by build() and then kept current by
+    # apply(structure, event, table, payload) for the writes to `tables`. Events for which
+    # resets(event, table, payload) is true drop it instead, and the next get() rebuilds it.
+    # build() may read a table before or after a write it races with, so the events that
+    # arrive while it runs are queued and applied to the new structure before anyone sees it;
+    # the apply functions therefore treat an insert of a row they already hold as a replace.
+    def __init__(self, build, apply, tables, resets=lambda event, table, payload: event == "reset"):
+        self._build, self._apply, self._tables, self._resets = build, apply, set(tables), resets
+        self._value = None
+        self._pending = None  # the queued events while a build runs
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        subscribe(self._on_change)
+
+    def _on_change(self, event, table, payload):
+        if table not in self._tables:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((event, table, payload))
+                return
+            value = self._value
+            if value is None:
+                return
+            if self._resets(event, table, payload):
+                self._value = None
+                return
+        self._apply(value, event, table, payload)
+
+    def get(self):
+        value = self._value
+        if value is not None:
+            return value
+        with self._build_lock:
+            value = self._value
+            while value is None:
+                with self._lock:
+                    self._pending = []
+                try:
+                    value = self._build()
+                except BaseException:
+                    with self._lock:
+                        self._pending = None
+                    raise
+                while value is not None:
+                    with self._lock:
+                        if not self._pending:
+                            self._pending, self._value = None, value
+                            break
+                        events, self._pending = self._pending, []
+                    if any(self._resets(*event) for event in events):
+                        value = None
+                    else:
+                        for event in events:
+                            self._apply(value, *event)
+            return value
+
+
+@instrument("storage.load_data", target="table", rows=result_len)
+def load_data(table):
+    if STORAGE_BACKEND == "excel":
+        _ensure_compactor()
+    else:
+        init_db()
+    return table_cache.get(table)
+
+
+@instrument("storage.save_data", target="table", rows=lambda result, df, *args, **kwargs: len(df))
+def save_data(df, table):
+    if STORAGE_BACKEND == "excel":
+        # Compaction lock before the database one, as in a compaction
+        with write_log.compaction_paused(), _table_write(table) as conn:
+            df = df.assign(**{VERSION_COLUMN: _bump_version(conn, table)})
+            _mark_reset(conn, table)
+            _write_workbook(table, df)
+            write_log.drop_table(table)
+            _record_workbook(conn, table)
+            _known_keys.pop(table, None)
+    else:
+        replace_table(table, df)
+    _written(table, "reset")
+
+
+@instrument("storage.insert_record", target="table", rows=lambda *args, **kwargs: 1)
+def insert_record(table, row):
+    if STORAGE_BACKEND == "excel":
+        with _table_write(table) as conn:
+            version = _bump_version(conn, table)
+            _log_write([{"op": "insert", "table": table, "row": _versioned(row, version)}])
+        _known_keys.get(table, set()).add(row[TABLES[table]["key"]])
+    else:
+        insert_row(table, row)
+    _written(table, "insert", row)
+
+
+@instrument("storage.insert_records", target="table", rows=lambda result, table, rows: len(rows))
+def insert_records(table, rows):
+    # Many inserts in a single write; listeners still see one "insert" per row
+    if not rows:
+        return
+    if STORAGE_BACKEND == "excel":
+        with _table_write(table) as conn:
+            version = _bump_version(conn, table)
+            _log_write([{"op": "insert", "table": table, "row": _versioned(row, version)} for row in rows])
+        _known_keys.get(table, set()).update(row[TABLES[table]["key"]] for row in rows)
+    else:
+        insert_rows(table, rows)
+    table_cache.after_write(table)
+    for row in rows:
+        _notify("insert", table, row)
+
+
+@instrument("storage.update_record", target="table", rows=lambda count, *args, **kwargs: count)
+def update_record(table, key_value, changes):
+    if STORAGE_BACKEND == "excel":
+        count = len(_existing_keys(table, [key_value]))
+        if count:
+            with _table_write(table) as conn:
+                version = _bump_version(conn, table)
+                _log_write([{"op": "update", "table": table, "key": key_value,
+                             "changes": _versioned(changes, version)}])
+    else:
+        count = update_row(table, key_value, changes)
+    if count:
+        _written(table, "update", {"key": key_value, "changes": changes})
+    return count
+
+
+@instrument("storage.update_records", target="table", rows=lambda count, *args, **kwargs: count)
+def update_records(table, updates):
+    # Many row updates in a single write; listeners still see one "update" per row. Keys that
+    # don't exist are skipped. Returns the number of rows updated.
+    if STORAGE_BACKEND == "excel" and updates:
+        known = set(_existing_keys(table, list(updates)))
+        updates = {key_value: changes for key_value, changes in updates.items() if key_value in known}
+    if not updates:
+        return 0
+    if STORAGE_BACKEND == "excel":
+        with _table_write(table) as conn:
+            version = _bump_version(conn, table)
+            _log_write([
+                {"op": "update", "table": table, "key": key_value, "changes": _versioned(changes, version)}
+                for key_value, changes in updates.items()
+            ])
+        count = len(updates)
+    else:
+        count = update_rows(table, updates)
+    table_cache.after_write(table)
+    for key_value, changes in updates.items():
+        _notify("update", table, {"key": key_value, "changes": changes})
+    return count
+
+
+@instrument("storage.update_matching", target="table", rows=lambda count, *args, **kwargs: count)
+def update_matching(table, changes, **filters):
+    # Sets `changes` on every row matching the filters of _conditions in a single write, without
+    # reading the rows first. Returns the number of rows updated.
+    conditions = _conditions(table, **filters)
+    if STORAGE_BACKEND == "excel":
+        df = load_data(table)
+        keys = df.loc[_mask(df, conditions), TABLES[table]["key"]].tolist()
+        return update_records(table, {key_value: changes for key_value in keys})
+    keys = update_where(table, changes, conditions)
+    if keys:
+        table_cache.after_write(table)
+        for key_value in keys:
+            _notify("update", table, {"key": key_value, "changes": changes})
+    return len(keys)
+
+
+# ---------- Users ----------
+def normalize_name(name):
+    return " ".join(str(name).split()).casefold()
+
+
+@instrument("storage.get_or_create_user")
+def get_or_create_user(name, session_token, state="Unknown"):
+    # Idempotent on (session, normalized name): repeating the request from the same session
+    # returns the user created the first time. Returns (user_id, created).
+    name = " ".join(str(name).split())
+    request_key = f"{session_token}:{normalize_name(name)}"
+    with _table_write("users") as conn:
+        row = conn.execute("SELECT user_id FROM user_requests WHERE idempotency_key = ?", (request_key,)).fetchone()
+        if row is not None:
+            return row[0], False
+        user = {"user_id": _next_ids(conn, "users", 1)[0], "name": name, "state": state}
+        row = _versioned(user, _bump_version(conn, "users"))
+        if STORAGE_BACKEND == "excel":
+            _log_write([{"op": "insert", "table": "users", "row": row}])
+        else:
+            cols = list(TABLES["users"]["columns"])
+            conn.execute(f"INSERT INTO users ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                         _row_values("users", row))
+        conn.execute("INSERT INTO user_requests (idempotency_key, user_id) VALUES (?, ?)", (request_key, user["user_id"]))
+    _written("users", "insert", user)
+    return user["user_id"], True
+
+
+# ---------- Queries ----------
+COMPLAINT_STATUSES = ["Open", "In Progress", "Pending", "Resolved", "Closed"]
+COMPLAINT_PRIORITIES = ["Low", "Medium", "High", "Urgent"]
+COMPLAINT_SORT_COLUMNS = ["complaint_date", "complaint_id", "complaint_status", "complaint_priority", "vendor_id"]
+SEARCH_RANK_WINDOW = 1_000
+
+
+@instrument("storage.get_record", target="table")
+def get_record(table, key_value):
+    key = TABLES[table]["key"]
+    if STORAGE_BACKEND == "excel":
+        df = load_data(table)
+        rows = df[df[key] == key_value].to_dict("records")
+        return rows[0] if rows else None
+    init_db()
+    cols = list(TABLES[table]["columns"])
+    row = get_connection().execute(
+        f"SELECT {', '.join(cols)} FROM {table} WHERE {key} = ?", (key_value,)
+    ).fetchone()
+    return dict(zip(cols, row)) if row is not None else None
+
+
+@instrument("storage.search_ids", target="table", rows=result_len)
+def search_ids(table, prefix, limit=20):
+    # Prefix lookup on the primary key, for search-as-you-type id pickers
+    key = TABLES[table]["key"]
+    prefix = prefix.strip().upper()
+    if STORAGE_BACKEND == "excel":
+        ids = load_data(table)[key].astype(str)
+        return ids[ids.str.startswith(prefix)].sort_values().head(limit).tolist()
+    init_db()
+    rows = get_connection().execute(
+        f"SELECT {key} FROM {table} WHERE {key} >= ? AND {key} < ? ORDER BY {key} LIMIT ?",
+        (prefix, prefix + "\uffff", limit),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def _conditions(table, statuses=None, priorities=None, vendor_id=None, date_from=None, date_to=None,
+                since_version=None, product_id=None):
+    # -> [(column, operator, value)], turned into SQL by _where and into a mask by _mask.
+    # date_to is inclusive; since_version keeps rows written after that table version.
+    date_col = TABLES[table]["date"]
+    conditions = []
+    if statuses:
+        conditions.append(("complaint_status", "IN", list(statuses)))
+    if priorities:
+        conditions.append(("complaint_priority", "IN", list(priorities)))
+    if vendor_id is not None:
+        conditions.append(("vendor_id", "=", vendor_id))
+    if product_id is not None:
+        conditions.append(("product_id", "=", product_id))
+    if date_from is not None:
+        conditions.append((date_col, ">=", pd.Timestamp(date_from)))
+    if date_to is not None:
+        conditions.append((date_col, "<", pd.Timestamp(date_to) + pd.Timedelta(days=1)))
+    if since_version is not None:
+        conditions.append((VERSION_COLUMN, ">", since_version))
+    return conditions
+
+
+def _clauses(conditions, prefix=""):
+    # prefix qualifies the columns, e.g. "complaints." in a join
+    clauses, params = [], []
+    for col, op, value in conditions:
+        col = prefix + col
+        if op == "IN":
+            clauses.append(f"{col} IN ({', '.join('?' * len(value))})")
+            params += [_to_sql_value(v) for v in value]
+        else:
+            clauses.append(f"{col} {op} ?")
+            params.append(_to_sql_value(value))
+    return clauses, params
+
+
+def _where(conditions):
+    clauses, params = _clauses(conditions)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+_OPERATORS = {"=": operator.eq, ">": operator.gt, ">=": operator.ge, "<": operator.lt}
+
+
+def _mask(df, conditions):
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in conditions:
+        # A workbook only grows row_version once a versioned write reaches it
+        series = df[col] if col in df.columns else pd.Series(float("nan"), index=df.index)
+        mask &= series.isin(value) if op == "IN" else _OPERATORS[op](series, value)
+    return mask
+
+
+@instrument("storage.query_complaints", rows=lambda result, *args, **kwargs: len(result[0]))
+def query_complaints(statuses=None, priorities=None, vendor_id=None, date_from=None, date_to=None,
+                     sort_by="complaint_date", descending=True, page=1, page_size=50):
+    # Filters, sorts and pages on the backend so only the visible page is materialized.
+    # date_to is inclusive. Returns (page DataFrame, total number of matching complaints).
+    if sort_by not in COMPLAINT_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort complaints by {sort_by!r}")
+    offset = max(page - 1, 0) * page_size
+    conditions = _conditions("complaints", statuses, priorities, vendor_id, date_from, date_to)
+
+    if STORAGE_BACKEND == "excel":
+        df = load_data("complaints")
+        mask = _mask(df, conditions)
+        matched = df[mask].sort_values([sort_by, "complaint_id"], ascending=not descending)
+        return matched.iloc[offset:offset + page_size].reset_index(drop=True), int(mask.sum())
+
+    where, params = _where(conditions)
+    order = "DESC" if descending else "ASC"
+    init_db()
+    conn = get_connection()
+    total = conn.execute(f"SELECT COUNT(*) FROM complaints {where}", params).fetchone()[0]
+    cols = ", ".join(TABLES["complaints"]["columns"])
+    df = pd.read_sql_query(
+        f"SELECT {cols} FROM complaints {where} ORDER BY {sort_by} {order}, complaint_id {order} LIMIT ? OFFSET ?",
+        conn,
+        params=params + [page_size, offset],
+    )
+    return _from_sql("complaints", df), total
+
+
+def count_vendor_rows(table, vendor_id):
+    # SQLite backend only; the excel backend counts from indexes.VendorPartitions
+    init_db()
+    return get_connection().execute(f"SELECT COUNT(*) FROM {table} WHERE vendor_id = ?", (vendor_id,)).fetchone()[0]
+
+
+@instrument("storage.query_vendor_rows", target="table", rows=result_len)
+def query_vendor_rows(table, vendor_id, page=1, page_size=25, descending=True):
+    # One page of a vendor's complaints or reviews by date, walked along the (vendor_id, date)
+    # index: no sort and nothing beyond the page is read, whatever was written since. Undated
+    # rows come last when newest is first; ties go by insertion order. SQLite backend only.
+    init_db()
+    date_col = TABLES[table]["date"]
+    cols = ", ".join(TABLES[table]["columns"])
+    order = "DESC" if descending else "ASC"
+    df = pd.read_sql_query(
+        f"SELECT {cols} FROM {table} WHERE vendor_id = ? ORDER BY {date_col} {order}, rowid {order} LIMIT ? OFFSET ?",
+        get_connection(),
+        params=[vendor_id, page_size, max(page - 1, 0) * page_size],
+    )
+    return _from_sql(table, df)
+
+
+def _search_terms(text):
+    # "quoted phrases" stay phrases, every other word is a term; a trailing * makes a prefix.
+    # -> [(terms, prefix)], every entry must match
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        value = (phrase or word).strip()
+        prefix = not phrase and value.endswith("*")
+        value = value.rstrip("*").strip()
+        if value:
+            terms.append((value, prefix))
+    return terms
+
+
+def _fts_phrase(value, prefix=False):
+    # Quoted, so user input can't be read as FTS5 syntax (AND, NEAR, column filters)
+    return '"' + str(value).replace('"', '""') + '"' + ("*" if prefix else "")
+
+
+@instrument("storage.search_text", target="table", rows=result_len)
+def search_text(table, text, limit=50, **filters):
+    # Ranked keyword/phrase search over the table's text column, narrowed by the filters of
+    # _conditions (statuses, vendor_id, product_id, dates). Best match first; adds a "score"
+    # column (higher is better) and a "snippet" with the matches in [brackets]. When only the
+    # newest SEARCH_RANK_WINDOW matches were ranked, df.attrs["ranked_newest"] says so.
+    text_col = TABLES[table]["text"]
+    cols = list(TABLES[table]["columns"])
+    terms = _search_terms(text)
+    if not terms:
+        return pd.DataFrame(columns=cols + ["score", "snippet"])
+    init_db()
+    conditions = _conditions(table, **filters)
+
+    if STORAGE_BACKEND == "excel" or not _text_index:
+        # Scan of the cached table: each term must occur, score is the number of occurrences
+        df = load_data(table)
+        df = df[_mask(df, conditions)]
+        texts = df[text_col].fillna("").astype(str).str.casefold()
+        found = pd.Series(True, index=df.index)
+        score = pd.Series(0, index=df.index)
+        for value, _ in terms:
+            counts = texts.str.count(re.escape(value.casefold()))
+            found &= counts > 0
+            score += counts
+        matched = df[found].assign(score=score[found].astype(float), snippet=df.loc[found, text_col])
+        return (matched.sort_values(["score", TABLES[table]["date"]], ascending=False)
+                .head(limit).reindex(columns=cols + ["score", "snippet"]).reset_index(drop=True))
+
+    # Vendor/product filters become column filters of the MATCH; the rest are checked on the
+    # joined rows, with a unary + so SQLite never drives the query by one of their indexes and
+    # probes the text index once per row, which is ruinous for a busy vendor
+    fts = f"{table}_fts"
+    text_col = TABLES[table]["text"]
+    expression = [f"{text_col} : ({' '.join(_fts_phrase(value, prefix) for value, prefix in terms)})"]
+    expression += [f"{col} : {_fts_phrase(value)}" for col, op, value in conditions if col in TEXT_FILTER_COLUMNS]
+    clauses, params = _clauses([c for c in conditions if c[0] not in TEXT_FILTER_COLUMNS], prefix=f"+{table}.")
+    join = f"JOIN {table} ON {table}.rowid = {fts}.rowid " if clauses else ""
+    matches = f"FROM {fts} {join}WHERE {' AND '.join([f'{fts} MATCH ?'] + clauses)}"
+    params = [" AND ".join(expression)] + params
+    conn = get_connection()
+    # bm25 costs a few µs per match (at 200k complaints, 180ms for a term in 25k of them against
+    # 12ms windowed), so broad queries are ranked over their newest SEARCH_RANK_WINDOW matches
+    # only; the cutoff comes from walking the index by rowid, which is cheap
+    cutoff = conn.execute(
+        f"SELECT {fts}.rowid {matches} ORDER BY {fts}.rowid DESC LIMIT 1 OFFSET ?", params + [SEARCH_RANK_WINDOW]
+    ).fetchone()
+    if cutoff is not None:
+        matches += f" AND {fts}.rowid > ?"
+        params.append(cutoff[0])
+    # Only the text column counts towards the score; rows are fetched for the top `limit` only
+    rank = f"bm25({fts}, 1.0{', 0.0' * len(TEXT_FILTER_COLUMNS)})"
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(f'{table}.{c}' for c in cols)}, hits.score, hits.snippet FROM ("
+        f"SELECT {fts}.rowid AS hit, -{rank} AS score, snippet({fts}, 0, '[', ']', '…', 12) AS snippet "
+        f"{matches} ORDER BY {rank}, {fts}.rowid DESC LIMIT ?"
+        f") AS hits JOIN {table} ON {table}.rowid = hits.hit ORDER BY hits.score DESC, hits.hit DESC",
+        conn,
+        params=params + [limit],
+    )
+    df = _from_sql(table, df)
+    if cutoff is not None:
+        df.attrs["ranked_newest"] = SEARCH_RANK_WINDOW
+    return df
+
+
+def count_rows(table, **filters):
+    # Number of rows read_snapshot would yield for the same filters
+    conditions = _conditions(table, **filters)
+    if STORAGE_BACKEND == "excel":
+        return int(_mask(load_data(table), conditions).sum())
+    init_db()
+    where, params = _where(conditions)
+    return get_connection().execute(f"SELECT COUNT(*) FROM {table} {where}", params).fetchone()[0]
+
+
+@contextmanager
+def read_snapshot(table, chunk_size=50_000, **filters):
+    # Yields (version, chunks): the table version the rows reflect and an iterator over the
+    # matching rows in DataFrames of at most chunk_size rows, in insertion order. filters are those
+    # of _conditions. SQLite reads use a connection of their own holding one read transaction, so
+    # a long export sees a single consistent state and never holds up the writers.
+    conditions = _conditions(table, **filters)
+    if STORAGE_BACKEND == "excel":
+        # Version first: the rows can only be newer than it, so an incremental run never skips any
+        version = table_version(table)
+        df = load_data(table)
+        positions = np.flatnonzero(_mask(df, conditions).to_numpy())
+        yield version, (df.iloc[positions[i:i + chunk_size]] for i in range(0, len(positions), chunk_size))
+        return
+    init_db()
+    conn = sqlite3.connect(DB_FILE, timeout=30)
+    try:
+        conn.execute("BEGIN")
+        version = _table_version(conn, table)
+        where, params = _where(conditions)
+        cols = ", ".join(TABLES[table]["columns"])
+        chunks = pd.read_sql_query(
+            f"SELECT {cols} FROM {table} {where} ORDER BY rowid", conn, params=params, chunksize=chunk_size
+        )
+        yield version, (_from_sql(table, chunk) for chunk in chunks)
+    finally:
+        conn.close()
+
+
+# ---------- Export Runs ----------
+# One row per incremental export; a feed's next run starts from the highest version it has exported
+def last_export_version(feed, table):
+    init_db()
+    row = get_connection().execute(
+        "SELECT MAX(to_version) FROM export_runs WHERE feed = ? AND table_name = ?", (feed, table)
+    ).fetchone()
+    return row[0]
+
+
+def record_export(feed, table, from_version, to_version, rows, path):
+    with _write_transaction() as conn:
+        conn.execute(
+            "INSERT INTO export_runs (feed, table_name, from_version, to_version, rows, path, exported_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (feed, table, from_version, to_version, rows, path, _to_sql_value(pd.Timestamp.now())),
+        )
+
+
+def export_runs(limit=20):
+    init_db()
+    return pd.read_sql_query(
+        "SELECT feed, table_name, from_version, to_version, rows, path, exported_at FROM export_runs "
+        "ORDER BY run_id DESC LIMIT ?",
+        get_connection(),
+        params=[limit],
+    )
+
+
+# ---------- CLI ----------
+# python storage.py import            -> (re)load Data/*.xlsx into the database
+# python storage.py export [out_dir]  -> write every table back to xlsx for the analysts
+# python storage.py reindex           -> rebuild the text search indexes
+# python storage.py compact           -> excel backend: fold pending writes into the workbooks now
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "import":
+        import_excel()
+        print(f"Imported {', '.join(TABLES)} into {DB_FILE}")
+    elif command == "export":
+        out = sys.argv[2] if len(sys.argv) > 2 else DATA_DIR
+        os.makedirs(out, exist_ok=True)
+        for path in export_excel(out):
+            print(f"Wrote {path}")
+    elif command == "reindex":
+        rebuild_text_indexes()
+        print(f"Rebuilt the text search indexes in {DB_FILE}")
+    elif command == "compact":
+        folded = compact_write_log()
+        print(f"Folded {folded} pending writes into the workbooks")
+    else:
+        print("usage: python storage.py import | export [out_dir] | reindex | compact")
+        sys.exit(1)
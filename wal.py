@@ -0,0 +1,164 @@
+# wal.py
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- File Locking ----------
+@contextmanager
+def file_lock(path):
+    # Exclusive advisory lock shared by every process using the same lock file
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_atomic(path, write):
+    # write(file_obj) fills a temp file next to `path`, which then replaces it in one rename,
+    # so readers and crashes only ever see the old or the new file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ---------- Write-Ahead Log ----------
+# Submissions are appended (and fsync'd) to a JSONL log and acknowledged at once. A compactor
+# folds the log into the snapshot files: the log is first renamed to <log>.compacting so new
+# appends never wait on it, then every snapshot is rewritten atomically, then the rotated log is
+# deleted. Replay is idempotent (inserts skip existing keys, updates set values), so a crash at
+# any point is recovered by replaying whatever logs are still on disk over the snapshots.
+class WriteAheadLog:
+    def __init__(self, path):
+        self.path = path
+        self.compacting_path = path + ".compacting"
+        self._append_lock_path = path + ".lock"
+        self._compact_lock_path = path + ".compact.lock"
+        self._lock = threading.Lock()
+
+    def append(self, entries):
+        lines = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries)
+        with self._lock, file_lock(self._append_lock_path):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-append was never acknowledged
+                    logger.warning("Skipping unreadable log line in %s", path)
+        return entries
+
+    def entries(self, table=None):
+        entries = self._read(self.compacting_path) + self._read(self.path)
+        return [e for e in entries if table is None or e["table"] == table]
+
+    def compact(self, fold):
+        # fold(entries) must write every affected snapshot atomically
+        with file_lock(self._compact_lock_path):
+            with self._lock, file_lock(self._append_lock_path):
+                if not os.path.exists(self.compacting_path) and os.path.exists(self.path):
+                    os.replace(self.path, self.compacting_path)
+            entries = self._read(self.compacting_path)
+            if entries:
+                fold(entries)
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+            return len(entries)
+
+    @contextmanager
+    def compaction_paused(self):
+        # For a block that replaces a snapshot wholesale and drops the table's pending entries:
+        # a compaction that had already read the old snapshot would write it back over the new one
+        with file_lock(self._compact_lock_path):
+            yield
+
+    def drop_table(self, table):
+        with self._lock, file_lock(self._append_lock_path):
+            for path in (self.compacting_path, self.path):
+                kept = [e for e in self._read(path) if e["table"] != table]
+                if os.path.exists(path):
+                    lines = "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in kept)
+                    write_atomic(path, lambda f: f.write(lines.encode("utf-8")))
+
+    def start_compactor(self, fold, interval=30):
+        def run():
+            while True:
+                try:
+                    self.compact(fold)
+                except Exception:
+                    logger.exception("Log compaction failed; will retry")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="wal-compactor", daemon=True)
+        thread.start()
+        return thread
+
+
+def apply_entries(df, key, entries):
+    # Replays log entries on top of a snapshot frame
+    positions = {k: i for i, k in enumerate(df[key])}
+    inserts, updates = [], []
+    for entry in entries:
+        if entry["op"] == "insert":
+            k = entry["row"][key]
+            if k not in positions:
+                positions[k] = len(df) + len(inserts)
+                inserts.append(entry["row"])
+        else:
+            updates.append(entry)
+    if inserts:
+        df = pd.concat([df, pd.DataFrame(inserts)], ignore_index=True)
+    for entry in updates:
+        pos = positions.get(entry["key"])
+        if pos is not None:
+            for col, value in entry["changes"].items():
+                if col not in df.columns:
+                    df[col] = None
+                try:
+                    df.loc[pos, col] = value
+                except (TypeError, ValueError):
+                    # A column that is empty in the workbook reads back as float64, which refuses
+                    # e.g. the first sentiment label; widen it instead of failing every replay
+                    df[col] = df[col].astype(object)
+                    df.loc[pos, col] = value
+    return df